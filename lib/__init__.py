@@ -0,0 +1,37 @@
+# coding=utf-8
+
+"""
+mynlp_libs: 自然言語処理用のライブラリ
+
+サブモジュールは属性として初めて参照された時点でimportされる。
+そのため、`import lib`だけではsklearnやscipyなどの重い依存ライブラリは読み込まれない。
+"""
+
+import importlib
+
+__all__ = [
+    "const",
+    "extractor",
+    "hashing",
+    "lazy",
+    "logger",
+    "metrics",
+    "ngrams",
+    "pipeline",
+    "profiler",
+    "serializer",
+    "text_processor"
+]
+
+
+def __getattr__(name):
+    if name not in __all__:
+        raise AttributeError(
+                "module {!r} has no attribute {!r}".format(__name__, name)
+        )
+
+    return importlib.import_module("." + name, __name__)
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
@@ -0,0 +1,9 @@
+# coding=utf-8
+
+"""
+各モジュールのベンチマークを提供するパッケージ
+
+generators: 決定的な合成データ(段落、タブ区切りコーパス、SVMlight/LETORファイル)の生成
+fake_mecab: MeCabを用いずにextract_wordsを動かすための疑似Tagger
+runner: 関数・データサイズごとの処理時間とピークメモリを計測し、ベースラインと比較する
+"""
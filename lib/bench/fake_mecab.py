@@ -0,0 +1,153 @@
+# coding=utf-8
+
+"""
+MeCab.Taggerと同じインタフェースを持つ疑似Taggerを提供するモジュール
+
+MeCabがインストールされていない環境でもtext_processor.extract_wordsを計測できるよう、
+parse/parseToNodeと、surface/feature/nextを持つノードの連結リストを返す。
+解析結果はIPA辞書の形式(品詞,品詞細分類1,...,原形,読み,発音)を模している。
+"""
+
+import re
+
+from .generators import _NOUNS, _PARTICLES
+
+# 表層をキーとして、(品詞, 品詞細分類, 原形)を保持する
+_DICTIONARY = dict(
+    [(n, ("名詞", "一般", n)) for n in _NOUNS] +
+    [(p, ("助詞", "格助詞", p)) for p in _PARTICLES] +
+    [
+        ("行き", ("動詞", "自立", "行く")),
+        ("食べ", ("動詞", "自立", "食べる")),
+        ("見", ("動詞", "自立", "見る")),
+        ("思い", ("動詞", "自立", "思う")),
+        ("する", ("動詞", "自立", "する")),
+        ("疲れ", ("動詞", "自立", "疲れる")),
+        ("楽しかっ", ("形容詞", "自立", "楽しい")),
+        ("ありませ", ("動詞", "非自立", "ある")),
+        ("まし", ("助動詞", "*", "ます")),
+        ("ます", ("助動詞", "*", "ます")),
+        ("ん", ("助動詞", "*", "ん")),
+        ("た", ("助動詞", "*", "た")),
+        ("です", ("助動詞", "*", "です")),
+        ("でし", ("助動詞", "*", "です")),
+        ("つもり", ("名詞", "非自立", "つもり"))
+    ]
+)
+_BOS_EOS_FEATURE = "BOS/EOS,*,*,*,*,*,*,*,*"
+
+# 辞書にない文字列は、文字種ごとのまとまりを1単語とする
+_UNKNOWN_PATTERNS = [
+    ("[一-龥々]+", ("名詞", "一般")),
+    ("[ァ-ヶー]+", ("名詞", "固有名詞")),
+    ("[ぁ-ん]+", ("名詞", "非自立")),
+    ("[A-Za-z0-9<>]+", ("名詞", "固有名詞")),
+    ("\\s+", None),
+    (".", ("記号", "一般"))
+]
+
+
+def _build_regex():
+    """ 辞書の見出し語(最長一致)と未知語のパターンを結合した正規表現を作る。
+
+    Returns:
+        re.Pattern: 単語分割に用いる正規表現
+    """
+
+    words = sorted(_DICTIONARY, key=len, reverse=True)
+    alternatives = ["(?P<known>{})".format("|".join(map(re.escape, words)))]
+    alternatives += [
+        "(?P<unk{}>{})".format(i, pattern)
+        for i, (pattern, _) in enumerate(_UNKNOWN_PATTERNS)
+    ]
+
+    return re.compile("|".join(alternatives))
+
+
+_TOKEN_REGEX = _build_regex()
+
+
+class FakeNode(object):
+    """ MeCab.Nodeを模したノード
+
+    Attributes:
+        surface (str): 単語の表層
+        feature (str): ','区切りの解析結果
+        next (FakeNode): 次のノード。末尾ならNone
+    """
+
+    __slots__ = ("surface", "feature", "next")
+
+    def __init__(self, surface, feature):
+        self.surface = surface
+        self.feature = feature
+        self.next = None
+
+
+class FakeTagger(object):
+    """ MeCab.Taggerを模した疑似Tagger
+    """
+
+    @staticmethod
+    def _tokenize(text):
+        """ textを(表層, feature)のリストに分割する。
+
+        Args:
+            text (str): 解析する文
+
+        Returns:
+            list: (表層, feature)のtupleのリスト
+        """
+
+        tokens = []
+        for m in _TOKEN_REGEX.finditer(text):
+            surface = m.group()
+            if m.lastgroup == "known":
+                pos, ctype, baseform = _DICTIONARY[surface]
+            else:
+                tag = _UNKNOWN_PATTERNS[int(m.lastgroup[3:])][1]
+                if tag is None:  # 空白は読み飛ばす
+                    continue
+                (pos, ctype), baseform = tag, "*"
+            tokens.append((
+                surface,
+                "{},{},*,*,*,*,{},*,*".format(pos, ctype, baseform)
+            ))
+
+        return tokens
+
+    def parse(self, text):
+        """ textを解析し、MeCabの標準出力形式の文字列を返す。
+
+        Args:
+            text (str): 解析する文
+
+        Returns:
+            str: 1行1単語の解析結果
+        """
+
+        lines = [
+            "{}\t{}".format(surface, feature)
+            for surface, feature in self._tokenize(text)
+        ]
+
+        return "\n".join(lines + ["EOS", ""])
+
+    def parseToNode(self, text):
+        """ textを解析し、BOSノードから始まるノードの連結リストを返す。
+
+        Args:
+            text (str): 解析する文
+
+        Returns:
+            FakeNode: 先頭(BOS)のノード
+        """
+
+        head = FakeNode("", _BOS_EOS_FEATURE)
+        node = head
+        for surface, feature in self._tokenize(text):
+            node.next = FakeNode(surface, feature)
+            node = node.next
+        node.next = FakeNode("", _BOS_EOS_FEATURE)
+
+        return head
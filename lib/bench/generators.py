@@ -0,0 +1,204 @@
+# coding=utf-8
+
+"""
+ベンチマーク用の合成データを生成するモジュール
+
+いずれの関数もseedを与えれば同じデータを生成する。
+"""
+
+import os
+import random
+
+# 日本語らしい文を組み立てるための語彙
+_NOUNS = [
+    "今日", "天気", "ブログ", "写真", "友達", "会社", "映画", "ラーメン",
+    "東京", "電車", "仕事", "週末", "猫", "本", "音楽", "旅行"
+]
+_PARTICLES = ["は", "が", "を", "に", "で", "と", "も", "の"]
+_PREDICATES = [
+    "行きました", "食べました", "見ました", "楽しかった", "疲れた",
+    "思います", "です", "でした", "ありません", "するつもり"
+]
+_DELIMITERS = ["。", "！", "？", "!", "?", "…", "．"]
+_ALPHABET_SENTS = ["OK!", "lol.", "Thanks!!", "www."]
+
+
+def _sentence(rng):
+    """ 名詞・助詞・述語を組み合わせた文(デリミタなし)を生成する。
+
+    Args:
+        rng (random.Random): 乱数生成器
+
+    Returns:
+        str: 生成した文
+    """
+
+    n_phrase = rng.randint(1, 4)
+    phrases = [
+        rng.choice(_NOUNS) + rng.choice(_PARTICLES) for _ in range(n_phrase)
+    ]
+
+    return "".join(phrases) + rng.choice(_PREDICATES)
+
+
+def japanese_paragraphs(n_paragraphs, sents_per_paragraph=5, quote_ratio=0.2,
+                        url_ratio=0.1, seed=0):
+    """ 「」で括られた引用やURLを含む、ブログ風の日本語段落を生成する。
+
+    sentenizeへの入力を想定している。
+    引用の中にはデリミタを含めるため、「」内のマスク処理も計測できる。
+
+    Args:
+        n_paragraphs (int): 生成する段落数
+        sents_per_paragraph (int): 1段落あたりの文数
+        quote_ratio (float): 文に「」の引用を含める確率
+        url_ratio (float): 文にURLを含める確率
+        seed (int): 乱数のseed
+
+    Returns:
+        list: 段落を要素として持つリスト
+    """
+
+    rng = random.Random(seed)
+    paragraphs = []
+    for _ in range(n_paragraphs):
+        sents = []
+        for _ in range(sents_per_paragraph):
+            sent = _sentence(rng)
+            if rng.random() < quote_ratio:
+                quote = _sentence(rng) + rng.choice(_DELIMITERS) + \
+                    _sentence(rng) + rng.choice(_DELIMITERS)
+                sent = "「{}」と{}".format(quote, sent)
+            if rng.random() < url_ratio:
+                sent += " http://example.com/{}/{}.html ".format(
+                        rng.randint(0, 9999), rng.randint(0, 99)
+                )
+            sents.append(sent + rng.choice(_DELIMITERS))
+        if rng.random() < 0.1:
+            sents.append(rng.choice(_ALPHABET_SENTS))
+        paragraphs.append("".join(sents))
+
+    return paragraphs
+
+
+def tokenized_lines(n_lines, tokens_per_line=20, vocab_size=10000, seed=0):
+    """ トークンをタブで区切った行を生成する。
+
+    トークンの出現頻度はZipf則に従うため、実際のコーパスに近い語彙分布となる。
+
+    Args:
+        n_lines (int): 生成する行数
+        tokens_per_line (int): 1行あたりのトークン数
+        vocab_size (int): 語彙数
+        seed (int): 乱数のseed
+
+    Returns:
+        list: タブ区切りの行を要素として持つリスト
+    """
+
+    rng = random.Random(seed)
+    vocab = ["w{}".format(i) for i in range(vocab_size)]
+    weights = [1.0 / (rank + 1) for rank in range(vocab_size)]
+    lines = []
+    for _ in range(n_lines):
+        tokens = rng.choices(vocab, weights=weights, k=tokens_per_line)
+        lines.append("\t".join(tokens))
+
+    return lines
+
+
+def write_tokenized_corpus(out_dir, n_docs, lines_per_doc=100,
+                           tokens_per_line=20, vocab_size=10000, seed=0):
+    """ タブ区切りのトークン列からなる文書ファイルをout_dirに書き出す。
+
+    Ngramsへの入力を想定している。
+
+    Args:
+        out_dir (str): 書き出すディレクトリ
+        n_docs (int): 文書数
+        lines_per_doc (int): 1文書あたりの行数
+        tokens_per_line (int): 1行あたりのトークン数
+        vocab_size (int): 語彙数
+        seed (int): 乱数のseed
+
+    Returns:
+        list: 書き出した文書ファイルのパスのリスト
+    """
+
+    if not os.path.isdir(out_dir):
+        os.makedirs(out_dir)
+
+    paths = []
+    for i in range(n_docs):
+        path = os.path.join(out_dir, "doc{:06d}.txt".format(i))
+        lines = tokenized_lines(
+                lines_per_doc,
+                tokens_per_line=tokens_per_line,
+                vocab_size=vocab_size,
+                seed=seed * 1000003 + i
+        )
+        with open(path, "w") as f:
+            f.write("\n".join(lines))
+        paths.append(path)
+
+    return paths
+
+
+def letor_lines(n_queries, docs_per_query=10, feature_num=10000,
+                nnz_per_doc=50, seed=0):
+    """ qidを含むSVMlight(LETOR)形式の行を生成する。
+
+    各行は"<label> qid:<qid> <idx>:<value> ..."の形式で、idxは1始まりの昇順。
+    ラベルは0または1で、extractorの入力を想定している。
+
+    Args:
+        n_queries (int): クエリ数
+        docs_per_query (int): 1クエリあたりの文書数
+        feature_num (int): 素性の次元数
+        nnz_per_doc (int): 1文書あたりの非ゼロ素性数
+        seed (int): 乱数のseed
+
+    Returns:
+        list: SVMlight形式の行を要素として持つリスト
+    """
+
+    rng = random.Random(seed)
+    nnz = min(nnz_per_doc, feature_num)
+    lines = []
+    for qid in range(1, n_queries + 1):
+        for _ in range(docs_per_query):
+            label = 1 if rng.random() < 0.3 else 0
+            idx = sorted(rng.sample(range(1, feature_num + 1), nnz))
+            features = " ".join("{}:1".format(i) for i in idx)
+            lines.append("{} qid:{} {}".format(label, qid, features))
+
+    return lines
+
+
+def write_letor_file(path, n_queries, docs_per_query=10, feature_num=10000,
+                     nnz_per_doc=50, seed=0):
+    """ qidを含むSVMlight(LETOR)形式のファイルを書き出す。
+
+    Args:
+        path (str): 書き出すファイルのパス
+        n_queries (int): クエリ数
+        docs_per_query (int): 1クエリあたりの文書数
+        feature_num (int): 素性の次元数
+        nnz_per_doc (int): 1文書あたりの非ゼロ素性数
+        seed (int): 乱数のseed
+
+    Returns:
+        str: 書き出したファイルのパス
+    """
+
+    lines = letor_lines(
+            n_queries,
+            docs_per_query=docs_per_query,
+            feature_num=feature_num,
+            nnz_per_doc=nnz_per_doc,
+            seed=seed
+    )
+    with open(path, "w") as f:
+        f.write("\n".join(lines))
+
+    return path
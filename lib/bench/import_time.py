@@ -0,0 +1,119 @@
+# coding=utf-8
+
+"""
+各モジュールのimportにかかる時間(コールドスタート)を計測するモジュール
+
+モジュールごとに新しいPythonプロセスを起動してimportの時間を計測する。
+あわせて、import後に読み込まれている重い依存ライブラリを記録するため、
+遅延importが効いているかを確認できる。
+
+Example:
+    $ python -m lib.bench.import_time --repeat 5
+"""
+
+import sys
+import json
+import argparse
+import subprocess
+from collections import OrderedDict
+
+MODULES = [
+    "lib",
+    "lib.const",
+    "lib.extractor",
+    "lib.hashing",
+    "lib.logger",
+    "lib.metrics",
+    "lib.ngrams",
+    "lib.pipeline",
+    "lib.profiler",
+    "lib.serializer",
+    "lib.text_processor"
+]
+
+# import時に読み込まれていないことを確認する依存ライブラリ
+HEAVY_DEPENDENCIES = ["numpy", "scipy", "sklearn", "joblib", "zenhan", "lib.cutils"]
+
+_SCRIPT = """
+import sys, time, json
+begin = time.perf_counter()
+import {module}
+seconds = time.perf_counter() - begin
+loaded = [m for m in {deps!r} if m in sys.modules]
+print(json.dumps({{"seconds": seconds, "loaded": loaded}}))
+"""
+
+
+def measure_import(module, repeat=5):
+    """ moduleのimport時間を、新しいプロセスでrepeat回計測した最小値を返す。
+
+    Args:
+        module (str): importするモジュール名
+        repeat (int): 計測する回数
+
+    Returns:
+        dict: seconds(import時間[秒])とloaded(読み込まれた重い依存ライブラリ)を持つdict。
+              importに失敗した場合はerrorを持つdict
+    """
+
+    script = _SCRIPT.format(module=module, deps=HEAVY_DEPENDENCIES)
+    best = None
+    for _ in range(repeat):
+        proc = subprocess.Popen(
+                [sys.executable, "-c", script],
+                stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE
+        )
+        out, err = proc.communicate()
+        if proc.returncode != 0:
+            return {"error": err.decode("utf-8", "replace").strip().split("\n")[-1]}
+        result = json.loads(out.decode("utf-8"))
+        if best is None or result["seconds"] < best["seconds"]:
+            best = result
+
+    return best
+
+
+def run(modules=None, repeat=5):
+    """ 各モジュールのimport時間を計測する。
+
+    Args:
+        modules (list): 計測するモジュール名のリスト。Noneの場合はMODULESをすべて計測する。
+        repeat (int): 計測する回数
+
+    Returns:
+        dict: モジュール名をキーとする計測結果
+    """
+
+    modules = MODULES if modules is None else modules
+
+    return OrderedDict((m, measure_import(m, repeat=repeat)) for m in modules)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="mynlp_libs import-time benchmark")
+    parser.add_argument("--only", nargs="*", help="modules to measure (default: all)")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--output", help="path to save results as JSON")
+    args = parser.parse_args(argv)
+
+    results = run(modules=args.only, repeat=args.repeat)
+    for module, result in results.items():
+        if "error" in result:
+            print("{:<20} error: {}".format(module, result["error"]))
+        else:
+            print("{:<20} {:>8.1f}ms  loaded: {}".format(
+                module,
+                result["seconds"] * 1000,
+                ", ".join(result["loaded"]) or "-"
+            ))
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
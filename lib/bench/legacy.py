@@ -0,0 +1,76 @@
+# coding=utf-8
+
+"""
+Python 3移植前のextractor・Ngramsの処理を、Python 3で動くように再現したモジュール
+
+移植後の実装との処理速度の比較にのみ用いる。
+ファイルをテキストとして読み込んで全体をデコードし、str.splitで素性を取り出す点が移植前と同じである。
+"""
+
+import re
+from collections import Counter, defaultdict
+
+import numpy as np
+import scipy.sparse as sp
+
+
+def get_idx(case):
+    """ 移植前のcutils.get_idxと同じ処理(std::stringの分割)をstrに対して行う。
+    """
+
+    return [int(e[:e.find(":")])-1 for e in case.split(" ") if ("qid" in e)==False and (":" in e)==True]
+
+
+def sparse_data_format_to_index_list(path, feature_num, is_get_qid=False):
+    """ 移植前のextractor.sparse_data_format_to_index_listと同じ処理を行う。
+    """
+
+    y_list = []
+    qid_list = []
+
+    with open(path) as f:
+        features = f.read().strip().split("\n")
+
+    qid_p = re.compile(r"qid:(\d+)")
+    x_data, x_row_ind, x_col_ind = [], [], []
+    for i, case in enumerate(features):
+        label = -1.0 if case[0] == "0" else 1.0
+        y_list.append(label)
+
+        feature_idx = get_idx(case)
+        x_data += [1.0 for _ in range(len(feature_idx))]
+        x_row_ind += [i for _ in range(len(feature_idx))]
+        x_col_ind += feature_idx
+
+        if is_get_qid:
+            m = qid_p.search(case)
+            qid_list += [int(m.group(1))] if m!=None else []
+
+    N = len(y_list)
+    x_list = sp.csr_matrix((x_data, (x_row_ind, x_col_ind)), (N, feature_num))
+    y_list = np.asarray(y_list, dtype=np.int8)
+    qid_list = np.asarray(qid_list, dtype=np.int32)
+
+    return x_list, y_list, qid_list
+
+
+def make_ngrams(text_paths, N, THR=10000):
+    """ 移植前のNgrams.make_ngramsと同じ処理を、1プロセスで行う。
+    """
+
+    ngram_list = []
+    for path in text_paths:
+        with open(path, "rb") as f:
+            sents = f.read().decode("utf-8", "ignore").split(u"\n")
+        sents_tokens = [s.split(u"\t") for s in sents]
+        ngram_list += [
+            u"_".join(tokens[i:i+N])
+            for tokens in sents_tokens
+            for i in range(len(tokens)+(-N+1))
+        ]
+
+    ngrams = Counter(ngram_list).most_common()[:THR]
+    vocab = defaultdict(lambda: len(vocab))
+    [vocab[tok[0]] for tok in ngrams]
+
+    return vocab
@@ -0,0 +1,423 @@
+# coding=utf-8
+
+"""
+各モジュールのベンチマークを実行し、結果をベースラインと比較するモジュール
+
+関数・データサイズごとに処理時間(repeat回の最小値)とピークメモリ(tracemalloc)を計測する。
+結果はJSONで保存でき、保存した結果をベースラインとして次回の実行結果と比較できる。
+
+Example:
+    $ python -m lib.bench.runner --sizes small medium --output baseline.json
+    $ python -m lib.bench.runner --sizes small medium --baseline baseline.json
+"""
+
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import platform
+import tempfile
+import tracemalloc
+from collections import OrderedDict
+
+from . import generators
+from .fake_mecab import FakeTagger
+
+# データサイズ名と、各ベンチマークの基本サイズに掛ける倍率
+SIZES = OrderedDict([
+    ("small", 1),
+    ("medium", 10),
+    ("large", 100)
+])
+
+
+def _bench_sentenize(scale, work_dir):
+    from ..text_processor import sentenize
+
+    paragraphs = generators.japanese_paragraphs(200 * scale)
+
+    # sentenizeは引数のリストを書き換えるため、毎回コピーを渡す
+    return lambda: sentenize(list(paragraphs))
+
+
+def _bench_extract_words(scale, work_dir):
+    from ..text_processor import extract_words
+
+    sents = generators.japanese_paragraphs(
+            1000 * scale,
+            sents_per_paragraph=1,
+            quote_ratio=0.0,
+            url_ratio=0.0
+    )
+    tagger = FakeTagger()
+
+    return lambda: extract_words(sents, tagger)
+
+
+def _bench_ngrams(scale, work_dir):
+    from ..ngrams import Ngrams
+
+    paths = generators.write_tokenized_corpus(
+            os.path.join(work_dir, "corpus"),
+            10 * scale
+    )
+
+    return lambda: Ngrams(paths, 1)
+
+
+def _bench_legacy_ngrams(scale, work_dir):
+    from . import legacy
+
+    paths = generators.write_tokenized_corpus(
+            os.path.join(work_dir, "corpus"),
+            10 * scale
+    )
+
+    return lambda: [legacy.make_ngrams(paths, n) for n in (1, 2, 3)]
+
+
+def _bench_hashing(scale, work_dir):
+    from ..hashing import HashingVectorizer
+
+    paths = generators.write_tokenized_corpus(
+            os.path.join(work_dir, "corpus"),
+            10 * scale
+    )
+    vectorizer = HashingVectorizer()
+
+    return lambda: vectorizer.transform_files(paths)
+
+
+def _bench_extractor_list(scale, work_dir):
+    from ..extractor import sparse_data_format_to_index_list
+
+    path = generators.write_letor_file(
+            os.path.join(work_dir, "letor.txt"),
+            100 * scale
+    )
+
+    return lambda: sparse_data_format_to_index_list(path, 10000, is_get_qid=True)
+
+
+def _bench_extractor_dic(scale, work_dir):
+    from ..extractor import sparse_data_format_to_index_dic
+
+    path = generators.write_letor_file(
+            os.path.join(work_dir, "letor.txt"),
+            100 * scale
+    )
+
+    return lambda: sparse_data_format_to_index_dic(path, 10000)
+
+
+def _bench_legacy_extractor_list(scale, work_dir):
+    from . import legacy
+
+    path = generators.write_letor_file(
+            os.path.join(work_dir, "letor.txt"),
+            100 * scale
+    )
+
+    return lambda: legacy.sparse_data_format_to_index_list(
+            path, 10000, is_get_qid=True)
+
+
+def _bench_pipeline_vocab(scale, work_dir):
+    from ..pipeline import VocabFeaturizer, corpus_pipeline
+    from .fake_mecab import _DICTIONARY
+
+    docs = [generators.japanese_paragraphs(5, seed=i) for i in range(100 * scale)]
+    vocab = dict((w[2], i) for i, w in enumerate(_DICTIONARY.values()))
+    pipe = corpus_pipeline(
+            VocabFeaturizer([vocab]),
+            tagger_factory=FakeTagger,
+            content_filter=False
+    )
+
+    # sentenizeは引数のリストを書き換えるため、毎回コピーを渡す
+    return lambda: pipe.to_csr([list(doc) for doc in docs])
+
+
+def _bench_pipeline_hashing(scale, work_dir):
+    from ..hashing import HashingVectorizer
+    from ..pipeline import corpus_pipeline
+
+    docs = [generators.japanese_paragraphs(5, seed=i) for i in range(100 * scale)]
+    pipe = corpus_pipeline(HashingVectorizer(), tagger_factory=FakeTagger)
+
+    # sentenizeは引数のリストを書き換えるため、毎回コピーを渡す
+    return lambda: pipe.to_csr([list(doc) for doc in docs])
+
+
+def _sparse_matrix(scale):
+    import scipy.sparse as sp
+
+    return sp.random(
+            1000 * scale, 10000, density=0.005, format="csr", random_state=0
+    )
+
+
+def _bench_serializer_dump(scale, work_dir):
+    from ..serializer import Serializer
+
+    path = os.path.join(work_dir, "data.pkl.gz")
+    data = [_sparse_matrix(scale)]
+
+    return lambda: Serializer.dump_data(data, path)
+
+
+def _bench_serializer_load(scale, work_dir):
+    from ..serializer import Serializer
+
+    path = os.path.join(work_dir, "data.pkl.gz")
+    Serializer.dump_data([_sparse_matrix(scale)], path)
+
+    return lambda: Serializer.load_data(path)
+
+
+def _bench_ranking_metrics(scale, work_dir):
+    import numpy as np
+    from ..metrics import calc_ranking_metrics
+
+    rng = np.random.RandomState(0)
+    n = 10000 * scale
+    label = rng.randint(0, 2, n)
+    score = rng.rand(n)
+    qid = np.repeat(np.arange(n // 10), 10)
+
+    return lambda: calc_ranking_metrics(label, score, qid)
+
+
+# ベンチマーク名をキーとして、(scale, work_dir)を受け取り計測対象の関数を返すsetup関数を保持する
+BENCHMARKS = OrderedDict([
+    ("text_processor.sentenize", _bench_sentenize),
+    ("text_processor.extract_words", _bench_extract_words),
+    ("ngrams.Ngrams", _bench_ngrams),
+    ("legacy.ngrams.Ngrams", _bench_legacy_ngrams),
+    ("hashing.HashingVectorizer", _bench_hashing),
+    ("extractor.sparse_data_format_to_index_list", _bench_extractor_list),
+    ("extractor.sparse_data_format_to_index_dic", _bench_extractor_dic),
+    ("legacy.extractor.sparse_data_format_to_index_list",
+     _bench_legacy_extractor_list),
+    ("pipeline.corpus_pipeline.vocab", _bench_pipeline_vocab),
+    ("pipeline.corpus_pipeline.hashing", _bench_pipeline_hashing),
+    ("serializer.Serializer.dump_data", _bench_serializer_dump),
+    ("serializer.Serializer.load_data", _bench_serializer_load),
+    ("metrics.calc_ranking_metrics", _bench_ranking_metrics)
+])
+
+
+def measure(func, repeat=3):
+    """ funcの処理時間とピークメモリを計測する。
+
+    処理時間はrepeat回実行したうちの最小値とする。
+    tracemallocは処理時間に影響するため、ピークメモリは別に1回実行して計測する。
+
+    Args:
+        func (function): 引数なしで呼び出せる計測対象の関数
+        repeat (int): 処理時間を計測する回数
+
+    Returns:
+        dict: seconds(処理時間[秒])とpeak_kb(ピークメモリ[KB])を持つdict
+    """
+
+    seconds = float("inf")
+    for _ in range(repeat):
+        begin = time.perf_counter()
+        func()
+        seconds = min(seconds, time.perf_counter() - begin)
+
+    tracemalloc.start()
+    try:
+        func()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return {"seconds": seconds, "peak_kb": peak / 1024.0}
+
+
+def run(names=None, sizes=("small",), repeat=3):
+    """ ベンチマークを実行し、結果を返す。
+
+    ベンチマークが例外を送出した場合(依存ライブラリが無い場合など)は、
+    その例外をerrorとして記録し、残りのベンチマークを続行する。
+
+    Args:
+        names (list): 実行するベンチマーク名のリスト。Noneの場合はすべて実行する。
+        sizes (list): 実行するデータサイズ名のリスト
+        repeat (int): 処理時間を計測する回数
+
+    Returns:
+        dict: metaと、ベンチマーク名・データサイズ名をキーとする計測結果resultsを持つdict
+    """
+
+    names = list(BENCHMARKS) if names is None else names
+    results = OrderedDict()
+    for name in names:
+        results[name] = OrderedDict()
+        for size in sizes:
+            work_dir = tempfile.mkdtemp(prefix="mynlp_bench_")
+            try:
+                func = BENCHMARKS[name](SIZES[size], work_dir)
+                results[name][size] = measure(func, repeat=repeat)
+            except Exception as e:
+                results[name][size] = {
+                    "error": "{}: {}".format(type(e).__name__, e)
+                }
+            finally:
+                shutil.rmtree(work_dir, ignore_errors=True)
+
+    return {
+        "meta": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "repeat": repeat
+        },
+        "results": results
+    }
+
+
+# ベースラインと比較する指標と、表示に用いる単位
+METRICS = OrderedDict([
+    ("seconds", "s"),
+    ("peak_kb", "KB")
+])
+
+
+def _judge(ratio, threshold):
+    """ ベースラインに対する比率から、判定(regression, improvement, ok)を返す。
+    """
+
+    if ratio > 1.0 + threshold:
+        return "regression"
+    elif ratio < 1.0 - threshold:
+        return "improvement"
+
+    return "ok"
+
+
+def compare(current, baseline, threshold=0.1, memory_threshold=None):
+    """ 計測結果をベースラインと比較する。
+
+    処理時間・ピークメモリのそれぞれについて、ベースラインの(1 + threshold)倍を
+    超えた場合をregressionとする。
+
+    Args:
+        current (dict): runが返した計測結果
+        baseline (dict): ベースラインの計測結果
+        threshold (float): regressionとみなす処理時間の増加率
+        memory_threshold (float): regressionとみなすピークメモリの増加率。
+                                  Noneの場合はthresholdと同じ値を用いる。
+
+    Returns:
+        list: (ベンチマーク名, データサイズ名, 指標名, ベースラインの値, 値, 比率, 判定)のtupleのリスト
+    """
+
+    thresholds = {
+        "seconds": threshold,
+        "peak_kb": threshold if memory_threshold is None else memory_threshold
+    }
+    rows = []
+    for name, by_size in current["results"].items():
+        for size, result in by_size.items():
+            base = baseline["results"].get(name, {}).get(size)
+            for metric in METRICS:
+                if "error" in result or base is None or "error" in base \
+                        or metric not in base:
+                    rows.append((name, size, metric, None,
+                                 result.get(metric), None, "skip"))
+                    continue
+                ratio = result[metric] / base[metric] \
+                    if base[metric] > 0 else float("inf")
+                rows.append((
+                    name, size, metric, base[metric], result[metric], ratio,
+                    _judge(ratio, thresholds[metric])
+                ))
+
+    return rows
+
+
+def _name_width(names):
+    """ ベンチマーク名の列の幅として、最も長い名前の長さを返す。
+    """
+
+    return max([len(name) for name in names] or [0])
+
+
+def _format_results(current):
+    width = _name_width(current["results"])
+    lines = []
+    for name, by_size in current["results"].items():
+        for size, result in by_size.items():
+            if "error" in result:
+                lines.append("{:<{w}} {:<7} error: {}".format(
+                    name, size, result["error"], w=width))
+            else:
+                lines.append("{:<{w}} {:<7} {:>10.4f}s {:>12.1f}KB".format(
+                    name, size, result["seconds"], result["peak_kb"], w=width))
+
+    return "\n".join(lines)
+
+
+def _format_comparison(rows):
+    width = _name_width(row[0] for row in rows)
+    lines = []
+    for name, size, metric, base, cur, ratio, status in rows:
+        if status == "skip":
+            lines.append("{:<{w}} {:<7} {:<8} skip".format(
+                name, size, metric, w=width))
+        else:
+            unit = METRICS[metric]
+            lines.append(
+                "{:<{w}} {:<7} {:<8} {:>12.4f}{} -> {:>12.4f}{} x{:.2f} {}".format(
+                    name, size, metric, base, unit, cur, unit, ratio, status,
+                    w=width))
+
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="mynlp_libs benchmarks")
+    parser.add_argument("--only", nargs="*", choices=list(BENCHMARKS),
+                        help="benchmarks to run (default: all)")
+    parser.add_argument("--sizes", nargs="*", default=["small"],
+                        choices=list(SIZES))
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--output", help="path to save results as JSON")
+    parser.add_argument("--baseline", help="path to baseline JSON to compare")
+    parser.add_argument("--threshold", type=float, default=0.1,
+                        help="relative slowdown regarded as a regression")
+    parser.add_argument("--memory-threshold", type=float, default=None,
+                        help="relative peak memory increase regarded as a "
+                             "regression (default: same as --threshold)")
+    args = parser.parse_args(argv)
+
+    current = run(names=args.only, sizes=args.sizes, repeat=args.repeat)
+    print(_format_results(current))
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(current, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        rows = compare(
+                current,
+                baseline,
+                threshold=args.threshold,
+                memory_threshold=args.memory_threshold
+        )
+        print("")
+        print(_format_comparison(rows))
+        if any(row[-1] == "regression" for row in rows):
+            return 1
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
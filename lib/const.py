@@ -1,6 +1,6 @@
 # coding=utf-8
 
-from collections import Enum
+from enum import Enum
 
 # loggerがログを書き出すディレクトリ
 LOG_DIR = "./log"
@@ -16,6 +16,7 @@ class MeCabConst(Enum):
         EMPTY_STR (str): 要素が空であることを示す文字列
         CTYPE_NOUN (list): 内容語として扱う名詞の細分類
         CTYPE_VERB_ADJ (str): 内容語として扱う動詞・形容詞の細分類
+        POS_BOS_EOS (str): 文頭・文末のノードの品詞
     """
 
     BASEFORM_IDX = 6
@@ -31,6 +32,7 @@ class MeCabConst(Enum):
             '副詞可能'
     ]
     CTYPE_VB_ADJ = '自立'
+    POS_BOS_EOS = 'BOS/EOS'
 
 
 class SentenizerConst(Enum):
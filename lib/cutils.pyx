@@ -1,9 +1,87 @@
 # distutils: language = c++
+# cython: language_level=3, boundscheck=False, wraparound=False
 # coding=utf-8
 
-from libcpp.string cimport string
-from libcpp.vector cimport vector
+cdef enum:
+    TAB = 9
+    LF = 10
+    CR = 13
+    SPACE = 32
+    ZERO = 48
+    NINE = 57
+    COLON = 58
+    LOWER_D = 100
+    LOWER_I = 105
+    LOWER_Q = 113
 
-def get_idx(string case):
+# 素性のindex(1始まり)の上限。0始まりにした値がint32の範囲に収まるようにする
+cdef long long MAX_IDX = 2147483648
 
-    return [int(e[:e.find(":")])-1 for e in case.split(" ") if ("qid" in e)==False and (":" in e)==True]
+
+cdef inline bint is_separator(unsigned char c):
+    return c == SPACE or c == TAB or c == CR or c == LF
+
+
+def get_idx(const unsigned char[:] case):
+    """ SVMlight形式の1行から、素性のindex(0始まり)のリストを返す。
+
+    bytesやmemoryviewなど、バッファプロトコルに対応したオブジェクトを受け取り、
+    文字列に変換せずにバッファを直接走査する。
+    ':'を含まないトークン(ラベル)と、qidのトークンは読み飛ばす。
+    SVMlight形式のindexは1始まりなので、0や2**31を超えるindexはエラーとする。
+
+    Args:
+        case (bytes): SVMlight形式の1行 (e.g. b"1 qid:3 2:1 10:1")
+
+    Returns:
+        list: 素性のindexのリスト
+
+    Raises:
+        ValueError: indexが数字でない、または1からMAX_IDXの範囲外の場合
+    """
+
+    cdef Py_ssize_t n = case.shape[0]
+    cdef Py_ssize_t i = 0, j, begin, colon
+    cdef long long idx
+    result = []
+
+    while i < n:
+        while i < n and is_separator(case[i]):
+            i += 1
+        begin = i
+        colon = -1
+        while i < n and not is_separator(case[i]):
+            if colon < 0 and case[i] == COLON:
+                colon = i
+            i += 1
+
+        # ':'を含まないトークン(ラベル)とqidは読み飛ばす
+        if colon < 0:
+            continue
+        if colon - begin == 3 and case[begin] == LOWER_Q \
+                and case[begin + 1] == LOWER_I and case[begin + 2] == LOWER_D:
+            continue
+        if colon == begin:
+            raise ValueError("invalid feature: {!r}".format(bytes(case[begin:i])))
+
+        idx = 0
+        for j in range(begin, colon):
+            if case[j] < ZERO or case[j] > NINE:
+                raise ValueError(
+                        "invalid feature: {!r}".format(bytes(case[begin:i]))
+                )
+            idx = idx * 10 + (case[j] - ZERO)
+            # idxはMAX_IDX以下の間しか桁を増やさないため、オーバーフローしない
+            if idx > MAX_IDX:
+                raise ValueError(
+                        "feature index out of range: {!r}".format(
+                            bytes(case[begin:i]))
+                )
+        if idx == 0:
+            raise ValueError(
+                    "feature index must start from 1: {!r}".format(
+                        bytes(case[begin:i]))
+            )
+        result.append(idx - 1)
+
+    return result
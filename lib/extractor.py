@@ -1,23 +1,73 @@
 # coding=utf-8
 
-import scipy.sparse as sp
-import numpy as np
 import re
-from cutils import get_idx
+from .lazy import LazyModule
+from .profiler import timed, count, is_enabled
+
+sp = LazyModule("scipy.sparse")
+np = LazyModule("numpy")
+cutils = LazyModule(".cutils", __package__)
+
+
+def _read_cases(path):
+    """ SVMlight形式のファイルを読み込み、各行をbytesのまま返す。
+
+    文字列への変換は行わず、行はそのままcutils.get_idxに渡す。
+
+    Args:
+        path (str): 読み込むファイルのパス
+
+    Returns:
+        list: 各行(bytes)のリスト
+    """
+
+    with open(path, "rb") as f:
+        return f.read().strip().split(b"\n")
+
+
+def _to_csr(x_col_ind, x_indptr, feature_num, dtype=None):
+    """ 各行の素性のindexと行の開始位置から、値を1とするcsr_matrixを生成する。
+
+    Args:
+        x_col_ind (list): 全行の素性のindexを連結したリスト
+        x_indptr (list): 各行の開始位置のリスト(末尾は全体の素性数)
+        feature_num (int): 素性の次元数
+        dtype (numpy.dtype): 値の型。Noneの場合はfloat64
+
+    Returns:
+        scipy.sparse.csr_matrix: (行数, feature_num)の疎行列
+
+    Raises:
+        ValueError: 素性のindexが0からfeature_num - 1の範囲外の場合
+    """
+
+    x_col_ind = np.asarray(x_col_ind, dtype=np.int64)
+    if len(x_col_ind) and \
+            (x_col_ind.min() < 0 or x_col_ind.max() >= feature_num):
+        raise ValueError(
+                "feature index out of range [0, {}): min={}, max={}".format(
+                    feature_num, x_col_ind.min(), x_col_ind.max())
+        )
+    x_data = np.ones(len(x_col_ind), dtype=dtype or np.float64)
+    x_list = sp.csr_matrix(
+            (x_data, x_col_ind.astype(np.int32), x_indptr),
+            (len(x_indptr) - 1, feature_num)
+    )
+    # 同じ素性が1行に複数回現れた場合は、値を合算する
+    x_list.sum_duplicates()
+
+    return x_list
+
 
 # ToDo: リファクタリング
+@timed("extractor.sparse_data_format_to_index_dic")
 def sparse_data_format_to_index_dic(path, feature_num):
-    def get_features(path):
-        with open(path) as f:
-            features = f.read().strip().split("\n")
-        return features
-
     x_dic = {}
     y_dic = {}
-    features = get_features(path)
-    qid_p = re.compile("qid:(\d+)")
-    x_data, x_row_ind, x_col_ind = [], [], []
-    y_list, past_qid, i = [], None, 0
+    features = _read_cases(path)
+    qid_p = re.compile(rb"qid:(\d+)")
+    x_col_ind, x_indptr = [], [0]
+    y_list, past_qid = [], None
     for case in features:
         # for qid
         m = qid_p.search(case)
@@ -26,53 +76,48 @@ def sparse_data_format_to_index_dic(path, feature_num):
         if past_qid == None:
             past_qid = qid
         elif qid != past_qid:
-            x_list = sp.csr_matrix((x_data, (x_row_ind, x_col_ind)), (len(y_list), feature_num), dtype=np.int8)
+            x_list = _to_csr(x_col_ind, x_indptr, feature_num, dtype=np.int8)
             y_list = np.asarray(y_list, dtype=np.int8)
             x_dic[past_qid], y_dic[past_qid] = x_list, y_list
             # init
-            x_data, x_row_ind, x_col_ind = [], [], []
-            y_list, past_qid, i = [], qid, 0
+            x_col_ind, x_indptr = [], [0]
+            y_list, past_qid = [], qid
 
         # for y
-        label = 0 if case[0] == "0" else 1
+        label = 0 if case[:1] == b"0" else 1
         y_list.append(label)
 
         # for x
-        feature_idx = get_idx(case)
-        x_data += [1.0 for _ in xrange(len(feature_idx))]
-        x_row_ind += [i for _ in xrange(len(feature_idx))]
-        x_col_ind += feature_idx
-
-        i += 1
+        x_col_ind += cutils.get_idx(case)
+        x_indptr.append(len(x_col_ind))
                 
-    x_list = sp.csr_matrix((x_data, (x_row_ind, x_col_ind)), (len(y_list), feature_num), dtype=np.int8)
+    x_list = _to_csr(x_col_ind, x_indptr, feature_num, dtype=np.int8)
     y_list = np.asarray(y_list, dtype=np.int8)
     x_dic[past_qid], y_dic[past_qid] = x_list, y_list
 
+    if is_enabled():
+        count("extractor.sparse_data_format_to_index_dic", "lines", len(features))
+        count("extractor.sparse_data_format_to_index_dic", "nonzeros",
+              sum(x.nnz for x in x_dic.values()))
+
     return x_dic, y_dic
 
+@timed("extractor.sparse_data_format_to_index_list")
 def sparse_data_format_to_index_list(path, feature_num, is_get_qid=False):
     y_list = []
     qid_list = []
 
-    def get_features(path):
-        with open(path) as f:
-            features = f.read().strip().split("\n")
-        return features
-
-    features = get_features(path)
-    qid_p = re.compile("qid:(\d+)")
-    x_data, x_row_ind, x_col_ind = [], [], []
-    for i, case in enumerate(features):
+    features = _read_cases(path)
+    qid_p = re.compile(rb"qid:(\d+)")
+    x_col_ind, x_indptr = [], [0]
+    for case in features:
         # for y
-        label = -1.0 if case[0] == "0" else 1.0
+        label = -1.0 if case[:1] == b"0" else 1.0
         y_list.append(label)
 
         # for x
-        feature_idx = get_idx(case)
-        x_data += [1.0 for _ in xrange(len(feature_idx))]
-        x_row_ind += [i for _ in xrange(len(feature_idx))]
-        x_col_ind += feature_idx
+        x_col_ind += cutils.get_idx(case)
+        x_indptr.append(len(x_col_ind))
 
         # for qid
         if is_get_qid:
@@ -80,8 +125,12 @@ def sparse_data_format_to_index_list(path, feature_num, is_get_qid=False):
             qid_list += [int(m.group(1))] if m!=None else []
 
     N = len(y_list)
-    x_list = sp.csr_matrix((x_data, (x_row_ind, x_col_ind)), (N, feature_num))
+    x_list = _to_csr(x_col_ind, x_indptr, feature_num)
     y_list = np.asarray(y_list, dtype=np.int8)
     qid_list = np.asarray(qid_list, dtype=np.int32)
 
+    if is_enabled():
+        count("extractor.sparse_data_format_to_index_list", "lines", N)
+        count("extractor.sparse_data_format_to_index_list", "nonzeros", x_list.nnz)
+
     return x_list, y_list, qid_list
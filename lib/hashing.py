@@ -0,0 +1,134 @@
+# coding=utf-8
+
+"""
+語彙を用いずに、N-gramをハッシュ値で素性に変換する機能を提供するモジュール
+
+Ngramsのように事前にコーパス全体を走査して語彙を作る必要がなく、
+ワーカー間で語彙を共有する必要もないため、1パスのストリーミング処理で素性を生成できる。
+"""
+
+import io
+import zlib
+
+from .pipeline import Pipeline, Stage
+
+
+class HashingVectorizer(object):
+    """ 文ごとの単語列を、N-gramのハッシュ値に基づく素性に変換する。
+
+    N-gramはNgrams.ngramalizeと同じく、文内の連続するN個の単語を'_'で連結した文字列とする。
+    その文字列のCRC32の下位n_bitsビットを素性のindex、最上位ビットを符号として用いる(signed hashing)。
+    符号によって、衝突したN-gram同士の値が打ち消し合うため、内積の偏りが小さくなる。
+    連結した文字列のCRC32は単語ごとに逐次計算するため、N-gramの文字列は生成しない。
+
+    インスタンスはpipelineのステージ関数としても用いることができる。
+
+    Attributes:
+        n_bits (int): 素性の次元数を2^n_bitsとする(1以上31以下)
+        n_features (int): 素性の次元数
+        max_n (int): 生成するN-gramの最大のN。1からmax_nまでのN-gramを用いる。
+        signed (bool): Trueの場合はハッシュ値に応じて値の符号を反転する。
+        binary (bool): Trueの場合は値を符号のみ(1または-1)にする。
+    """
+
+    def __init__(self, n_bits=20, max_n=3, signed=True, binary=False):
+        if not 1 <= n_bits <= 31:
+            raise ValueError("n_bits must be in [1, 31], got {}".format(n_bits))
+        self.n_bits = n_bits
+        self.n_features = 2 ** n_bits
+        self.max_n = max_n
+        self.signed = signed
+        self.binary = binary
+
+    def __call__(self, sents_tokens):
+        """ 1文書分の単語列を素性に変換する。
+
+        Args:
+            sents_tokens (list): 文ごとの単語列(strのリスト)のリスト
+
+        Returns:
+            list: 素性のindexのリスト(昇順)
+            list: 素性の値のリスト
+        """
+
+        mask = self.n_features - 1
+        crc32 = zlib.crc32
+        values = {}
+        for tokens in sents_tokens:
+            heads = [t.encode("utf-8") for t in tokens]
+            # 2単語目以降は'_'で連結されるため、'_'を付けたものを用意しておく
+            tails = [b"_" + h for h in heads]
+            length = len(heads)
+            for i in range(length):
+                h = crc32(heads[i])
+                for j in range(i, min(i + self.max_n, length)):
+                    if j > i:
+                        h = crc32(tails[j], h)
+                    idx = h & mask
+                    v = -1.0 if self.signed and h >> 31 else 1.0
+                    values[idx] = values.get(idx, 0.0) + v
+
+        indices = sorted(i for i, v in values.items() if v != 0.0)
+        if self.binary:
+            return indices, [1.0 if values[i] > 0 else -1.0 for i in indices]
+
+        return indices, [values[i] for i in indices]
+
+    def transform(self, docs, process_num=1, chunksize=64, queue_size=64):
+        """ 文書を素性に変換し、1文書を1行とする疎行列を返す。
+
+        Args:
+            docs (iterable): 文ごとの単語列のリストを1文書として、文書を返すiterable
+            process_num (int): ワーカープロセス数
+            chunksize (int): ワーカープロセスにまとめて渡す文書数
+            queue_size (int): キューに積めるチャンク数の上限
+
+        Returns:
+            scipy.sparse.csr_matrix: (文書数, n_features)の疎行列
+        """
+
+        pipe = Pipeline(
+                [Stage(self, process_num=process_num, chunksize=chunksize)],
+                queue_size=queue_size
+        )
+
+        return pipe.to_csr(docs)
+
+    def transform_files(self, text_paths, process_num=1, chunksize=4,
+                        queue_size=64):
+        """ Ngramsと同じ形式のテキストファイルを素性に変換し、1ファイルを1行とする疎行列を返す。
+
+        各ファイルは1行1文で、文中の単語はタブで区切られているものとする。
+        ファイルの読み込みもワーカープロセスで行う。
+
+        Args:
+            text_paths (list): テキストファイルのパスのリスト
+            process_num (int): ワーカープロセス数
+            chunksize (int): ワーカープロセスにまとめて渡すファイル数
+            queue_size (int): キューに積めるチャンク数の上限
+
+        Returns:
+            scipy.sparse.csr_matrix: (ファイル数, n_features)の疎行列
+        """
+
+        pipe = Pipeline(
+                [Stage(_FileHashing(self), process_num=process_num,
+                       chunksize=chunksize)],
+                queue_size=queue_size
+        )
+
+        return pipe.to_csr(text_paths, n_features=self.n_features)
+
+
+class _FileHashing(object):
+    """ タブ区切りのテキストファイルを読み込み、HashingVectorizerで素性に変換するステージ関数
+    """
+
+    def __init__(self, vectorizer):
+        self.vectorizer = vectorizer
+
+    def __call__(self, path):
+        with io.open(path, encoding="utf-8", errors="ignore") as f:
+            sents_tokens = [line.rstrip("\n").split("\t") for line in f]
+
+        return self.vectorizer(sents_tokens)
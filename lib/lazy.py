@@ -0,0 +1,54 @@
+# coding=utf-8
+
+"""
+重いモジュールのimportを、初めて使われる時点まで遅延させる機能を提供するモジュール
+
+Example:
+    np = LazyModule("numpy")  # この時点ではnumpyはimportされない
+    np.zeros(3)               # 初めて属性にアクセスした時点でimportされる
+"""
+
+import importlib
+
+
+class LazyModule(object):
+    """ 属性に初めてアクセスした時点でモジュールをimportするプロキシ
+
+    一度参照した属性はインスタンスにキャッシュするため、
+    2回目以降の参照はプロキシを経由しない通常の属性参照と同じコストで済む。
+
+    Attributes:
+        name (str): importするモジュール名。'.'から始まる場合はpackageからの相対名
+        package (str): 相対importの基準となるパッケージ名
+    """
+
+    def __init__(self, name, package=None):
+        self.name = name
+        self.package = package
+        self._module = None
+
+    def load(self):
+        """ モジュールをimportして返す。import済みの場合はそれを返す。
+
+        Returns:
+            module: importしたモジュール
+        """
+
+        if self._module is None:
+            self._module = importlib.import_module(self.name, self.package)
+
+        return self._module
+
+    def __getattr__(self, attr):
+        # __getattr__はインスタンスに存在しない属性を参照した場合のみ呼ばれる
+        if attr.startswith("__"):
+            raise AttributeError(attr)
+        value = getattr(self.load(), attr)
+        setattr(self, attr, value)
+
+        return value
+
+    def __repr__(self):
+        state = "loaded" if self._module is not None else "not loaded"
+
+        return "<LazyModule '{}' ({})>".format(self.name, state)
@@ -2,33 +2,248 @@
 
 """
 logging機能を提供するモジュール
+
+ログレコードはQueueHandlerでキューに積まれ、QueueListenerのバックグラウンド
+スレッドでフォーマット・ファイル出力される。ホットループ内でログを出力しても、
+呼び出し側のスレッドがファイルI/Oで待たされることはない。
 """
 
 import os
+import queue
+import atexit
 import logging
+import threading
+from logging.handlers import QueueHandler, QueueListener
+
 from .const import LOG_DIR
+from .lazy import LazyModule
+
+multiprocessing = LazyModule("multiprocessing")
+
+LOG_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+
+# ログファイルのパスをキーとして、(キュー, QueueListener)を保持する
+_listeners = {}
+_listeners_lock = threading.Lock()
+
+
+class BufferedFileHandler(logging.FileHandler):
+    """ 指定した件数のレコードを書き込むごとにflushするFileHandler
+
+    logging.FileHandlerはレコードを書き込むたびにflushするが、
+    このハンドラはflush_interval件ごとにまとめてflushする。
+    close時には残りのレコードを必ずflushする。
+
+    Attributes:
+        flush_interval (int): flushを行うレコード数の間隔
+    """
+
+    def __init__(self, filename, flush_interval=1, **kwargs):
+        logging.FileHandler.__init__(self, filename, **kwargs)
+        self.flush_interval = max(1, flush_interval)
+        self._pending = 0
+
+    def emit(self, record):
+        """ レコードをストリームに書き込み、flush_interval件ごとにflushする。
+
+        Args:
+            record (logging.LogRecord): 書き込むレコード
+        """
+
+        try:
+            if self.stream is None:
+                self.stream = self._open()
+            self.stream.write(self.format(record) + self.terminator)
+            self._pending += 1
+            if self._pending >= self.flush_interval:
+                self.flush()
+        except Exception:
+            self.handleError(record)
+
+    def flush(self):
+        """ バッファに溜まったレコードをファイルに書き出す。
+        """
+
+        logging.FileHandler.flush(self)
+        self._pending = 0
+
+
+class _DeferredFormatQueueHandler(QueueHandler):
+    """ メッセージの引数の埋め込みのみを行い、行のフォーマットはListenerに任せるQueueHandler
+
+    QueueHandler.prepareはキューに積む前に行全体をフォーマットするが、
+    このハンドラは'msg % args'と例外のトレースバックの文字列化のみを呼び出し元で行う。
+    引数が後から書き換えられても、ログには呼び出し時点の値が出力される。
+    時刻などを含む行のフォーマットとファイルへの書き込みはListener側のスレッドで行う。
+    """
+
+    def prepare(self, record):
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = _EXC_FORMATTER.formatException(record.exc_info)
+            record.exc_info = None
+
+        return record
+
+
+_EXC_FORMATTER = logging.Formatter()
+
+
+def _get_log_path(file_name):
+    """ file_nameに対応するログファイルのパスを返す。
+
+    Args:
+        file_name (str): logを出力するファイル名
+
+    Returns:
+        str: ログファイルのパス
+    """
+
+    if not os.path.isdir(LOG_DIR):
+        os.makedirs(LOG_DIR)
+
+    return os.path.join(LOG_DIR, "{}.log".format(file_name))
+
+
+def start_listener(file_name, flush_interval=None, multiprocess=False):
+    """ file_nameに書き込むQueueListenerを起動し、レコードを積むキューを返す。
 
+    同じファイルに対してすでにListenerが起動している場合は、そのキューを返す。
+    その際にflush_intervalを指定した場合は、起動済みのListenerのflush間隔を変更する。
+    ただし、起動済みのListenerがプロセス間で共有できないキューを用いている場合に
+    multiprocess=Trueを指定すると、ワーカーのレコードが失われるためValueErrorを送出する。
+    multiprocess=Trueの場合はmultiprocessing.Queueを用いるため、
+    返されたキューをワーカープロセスに渡してget_worker_loggerで使うことで、
+    複数プロセスのログを1つのファイルに集約できる。
 
-def get_logger(file_name, logger_name="hogehogeLogger"):
+    Args:
+        file_name (str): logを出力するファイル名
+        flush_interval (int): ファイルをflushするレコード数の間隔。
+                              Noneの場合は、新しく起動するListenerでは1とし、
+                              起動済みのListenerでは変更しない。
+        multiprocess (bool): Trueの場合はプロセス間で共有できるキューを用いる
+
+    Returns:
+        queue.Queue or multiprocessing.Queue: ログレコードを積むキュー
+
+    Raises:
+        ValueError: multiprocess=Trueで、起動済みのListenerのキューがプロセス間で共有できない場合
+    """
+
+    path = _get_log_path(file_name)
+    with _listeners_lock:
+        if path in _listeners:
+            log_queue, listener = _listeners[path]
+            if multiprocess and isinstance(log_queue, queue.Queue):
+                raise ValueError(
+                        "listener for {} was started without multiprocess=True; "
+                        "call start_listener(..., multiprocess=True) before "
+                        "get_logger for the same file".format(path)
+                )
+            if flush_interval is not None:
+                for handler in listener.handlers:
+                    handler.flush_interval = max(1, flush_interval)
+            return log_queue
+
+        handler = BufferedFileHandler(
+                path,
+                flush_interval=1 if flush_interval is None else flush_interval
+        )
+        handler.setFormatter(logging.Formatter(LOG_FORMAT))
+        log_queue = multiprocessing.Queue() if multiprocess \
+            else queue.Queue()
+        listener = QueueListener(
+                log_queue,
+                handler,
+                respect_handler_level=True
+        )
+        listener.start()
+        _listeners[path] = (log_queue, listener)
+
+    return log_queue
+
+
+def stop_listeners():
+    """ 起動中のQueueListenerをすべて停止し、残りのレコードをファイルに書き出す。
+
+    停止したListenerのキューにレコードを積むQueueHandlerは各loggerから取り除くため、
+    停止後にget_loggerを呼ぶと新しいListenerが起動される。
+    プロセス終了時にはatexitにより自動的に呼ばれる。
+    """
+
+    with _listeners_lock:
+        stopped = [log_queue for log_queue, _ in _listeners.values()]
+        for _, listener in _listeners.values():
+            listener.stop()
+            for handler in listener.handlers:
+                handler.close()
+        _listeners.clear()
+
+    loggers = [logging.getLogger()] + [
+        logger for logger in logging.Logger.manager.loggerDict.values()
+        if isinstance(logger, logging.Logger)
+    ]
+    for logger in loggers:
+        for handler in list(logger.handlers):
+            if isinstance(handler, QueueHandler) and \
+                    any(handler.queue is q for q in stopped):
+                logger.removeHandler(handler)
+
+
+atexit.register(stop_listeners)
+
+
+def get_logger(file_name, logger_name="hogehogeLogger", flush_interval=None):
     """ loggerインスタンスを取得する
 
+    同じlogger_nameで複数回呼び出しても、ハンドラは重複して登録されない。
+    loggerが別のファイルに書き込むハンドラを持つ場合は、file_nameに書き込むハンドラで置き換える。
+    レコードのフォーマットとファイルへの書き込みはバックグラウンドスレッドで行う。
+
     Args:
         file_name (str): logを出力するファイル名
         logger_name (str): logの出力名
+        flush_interval (int): ファイルをflushするレコード数の間隔。
+                              Noneの場合はstart_listenerと同様に扱う。
 
     Returns:
         logger.Logger: フォーマット、出力名、出力ファイルが指定されたlogger
     """
 
+    log_queue = start_listener(file_name, flush_interval=flush_interval)
+    logger = logging.getLogger(logger_name)
+    handlers = [h for h in logger.handlers if isinstance(h, QueueHandler)]
+    if any(h.queue is log_queue for h in handlers):
+        return logger
+
+    for handler in handlers:
+        logger.removeHandler(handler)
+    logger.addHandler(_DeferredFormatQueueHandler(log_queue))
+    logger.setLevel(logging.DEBUG)
+
+    return logger
+
+
+def get_worker_logger(log_queue, logger_name="hogehogeLogger"):
+    """ ワーカープロセス内で、親プロセスのキューにレコードを送るloggerを取得する。
+
+    log_queueにはstart_listener(..., multiprocess=True)が返したキューを渡す。
+    レコードはpickleされて親プロセスに送られ、親プロセスのListenerが1つのファイルに書き込む。
+    fork時に親プロセスから引き継いだQueueHandlerは、log_queueに送るハンドラで置き換える。
+
+    Args:
+        log_queue (multiprocessing.Queue): 親プロセスのListenerが監視するキュー
+        logger_name (str): logの出力名
+
+    Returns:
+        logger.Logger: log_queueにレコードを送るlogger
+    """
+
     logger = logging.getLogger(logger_name)
-    handler = logging.FileHandler(
-            os.path.join(LOG_DIR, "{}.log".format(file_name))
-    )
-    formatter = logging.Formatter(
-            '%(asctime)s - %(name) - %(Levelname)s - %(message)s'
-    )
-    handler.setFormatter(formatter)
-    logger.addHandler(handler)
+    for handler in [h for h in logger.handlers if isinstance(h, QueueHandler)]:
+        logger.removeHandler(handler)
+    logger.addHandler(QueueHandler(log_queue))
     logger.setLevel(logging.DEBUG)
 
     return logger
@@ -5,18 +5,23 @@
 機能を提供するモジュール
 """
 
-from sklearn.metrics import accuracy_score
-from sklearn.metrics import recall_score
-from sklearn.metrics import precision_score
-from sklearn.metrics import f1_score
-from sklearn.metrics import classification_report
 from collections import namedtuple
 
+from .lazy import LazyModule
+
+np = LazyModule("numpy")
+skmetrics = LazyModule("sklearn.metrics")
+
 metrics = namedtuple(
         'metrics',
         ('acc', 'pre', 'rec', 'f1')
 )
 
+ranking_metrics = namedtuple(
+        'ranking_metrics',
+        ('ndcg', 'map', 'mrr')
+)
+
 
 class MetricsForCrossValidation():
     """ CrossValidationを行う際のMetric全般に関する機能を提供するクラス
@@ -43,23 +48,23 @@ class MetricsForCrossValidation():
             labels (list): ラベルの表層
         """
 
-        acc = accuracy_score(
+        acc = skmetrics.accuracy_score(
                     label_true,
                     label_pred
         )
-        pre = precision_score(
+        pre = skmetrics.precision_score(
                     label_true,
                     label_pred,
                     labels=labels,
                     average="micro"
         )
-        rec = recall_score(
+        rec = skmetrics.recall_score(
                     label_true,
                     label_pred,
                     labels=labels,
                     average="micro"
         )
-        f1 = f1_score(
+        f1 = skmetrics.f1_score(
                     label_true,
                     label_pred,
                     labels=labels,
@@ -92,9 +97,187 @@ class MetricsForCrossValidation():
         classification_reportを用いて計算するため、Weighted Averageである。
         """
 
-        acc = accuracy_score(
+        acc = skmetrics.accuracy_score(
                 self.label_true,
                 self.label_pred
         )
         print("Accuracy (MicroAverage): {}".format(acc))
-        print(classification_report(self.label_true, self.label_pred))
+        print(skmetrics.classification_report(self.label_true, self.label_pred))
+
+
+def _group_by_qid(label_true, score, qid):
+    """ qid昇順・スコア降順に事例を並べ替え、クエリ単位の集計に必要な配列を返す。
+
+    同一スコアの事例は入力時の順序を保つ(安定ソート)。
+    ラベルが正の値の事例を適合とみなし、負の値(-1など)は関連度0として扱う。
+
+    Args:
+        label_true (array-like): 正解ラベル(関連度)の系列
+        score (array-like): ランカーが出力したスコアの系列
+        qid (array-like): 各事例のqidの系列
+
+    Returns:
+        numpy.ndarray: 並べ替え後の関連度
+        numpy.ndarray: 並べ替え後の各事例が属するクエリのindex
+        numpy.ndarray: 各クエリの開始位置
+        numpy.ndarray: 並べ替え後の各事例のクエリ内での順位(1始まり)
+    """
+
+    label_true = np.asarray(label_true, dtype=np.float64)
+    score = np.asarray(score, dtype=np.float64)
+    qid = np.asarray(qid)
+    if not (len(label_true) == len(score) == len(qid)):
+        raise ValueError("label_true, score and qid must have the same length")
+
+    order = np.lexsort((-score, qid))
+    rel = np.maximum(label_true[order], 0.0)
+    # ソート済みなので、qidが切り替わる位置がクエリの境界となる
+    qid_sorted = qid[order]
+    is_start = np.ones(len(qid_sorted), dtype=bool)
+    is_start[1:] = qid_sorted[1:] != qid_sorted[:-1]
+    starts = np.flatnonzero(is_start)
+    group_idx = np.cumsum(is_start) - 1
+    rank = np.arange(len(rel)) - starts[group_idx] + 1
+
+    return rel, group_idx, starts, rank
+
+
+def _ndcg(rel, group_idx, starts, rank, k):
+    """ 並べ替え済みの配列から、クエリごとのNDCG@kを計算する。
+    """
+
+    n_group = len(starts)
+    discount = np.where(rank <= k, 1.0 / np.log2(rank + 1.0), 0.0)
+    dcg = np.bincount(
+            group_idx,
+            weights=(2.0 ** rel - 1.0) * discount,
+            minlength=n_group
+    )
+    # クエリ内で関連度の降順に並べたものが理想的な順位となる
+    ideal_rel = rel[np.lexsort((-rel, group_idx))]
+    idcg = np.bincount(
+            group_idx,
+            weights=(2.0 ** ideal_rel - 1.0) * discount,
+            minlength=n_group
+    )
+
+    return np.divide(dcg, idcg, out=np.zeros(n_group), where=idcg > 0)
+
+
+def _average_precision(rel, group_idx, starts, rank):
+    """ 並べ替え済みの配列から、クエリごとのAverage Precisionを計算する。
+    """
+
+    n_group = len(starts)
+    is_rel = (rel > 0).astype(np.float64)
+    cum_rel = np.cumsum(is_rel)
+    # 各クエリの開始位置より前に現れた適合事例数を引き、クエリ内の累積数にする
+    cum_rel_before = np.concatenate(([0.0], cum_rel))[starts]
+    hits = cum_rel - cum_rel_before[group_idx]
+    n_rel = np.bincount(group_idx, weights=is_rel, minlength=n_group)
+    prec_sum = np.bincount(
+            group_idx,
+            weights=is_rel * hits / rank,
+            minlength=n_group
+    )
+
+    return np.divide(prec_sum, n_rel, out=np.zeros(n_group), where=n_rel > 0)
+
+
+def _reciprocal_rank(rel, group_idx, starts, rank):
+    """ 並べ替え済みの配列から、クエリごとのReciprocal Rankを計算する。
+    """
+
+    rel_rank = np.where(rel > 0, rank, np.inf)
+    first_rank = np.minimum.reduceat(rel_rank, starts) \
+        if len(starts) > 0 else np.zeros(0)
+
+    return 1.0 / first_rank
+
+
+def ndcg_at_k(label_true, score, qid, k=10):
+    """ qidごとにNDCG@kを計算し、全クエリでの平均を返す。
+
+    Gainは2^rel - 1で計算する。適合事例を含まないクエリのNDCGは0とする。
+
+    Args:
+        label_true (array-like): 正解ラベル(関連度)の系列
+        score (array-like): ランカーが出力したスコアの系列
+        qid (array-like): 各事例のqidの系列
+        k (int): 評価に用いる上位の件数
+
+    Returns:
+        float: NDCG@kのクエリ平均
+    """
+
+    grouped = _group_by_qid(label_true, score, qid)
+
+    return float(np.mean(_ndcg(*grouped, k=k))) if len(grouped[2]) else 0.0
+
+
+def mean_average_precision(label_true, score, qid):
+    """ qidごとにAverage Precisionを計算し、全クエリでの平均(MAP)を返す。
+
+    適合事例を含まないクエリのAverage Precisionは0とする。
+
+    Args:
+        label_true (array-like): 正解ラベル(関連度)の系列
+        score (array-like): ランカーが出力したスコアの系列
+        qid (array-like): 各事例のqidの系列
+
+    Returns:
+        float: MAP
+    """
+
+    grouped = _group_by_qid(label_true, score, qid)
+
+    return float(np.mean(_average_precision(*grouped))) \
+        if len(grouped[2]) else 0.0
+
+
+def mean_reciprocal_rank(label_true, score, qid):
+    """ qidごとに最上位の適合事例の順位の逆数を計算し、全クエリでの平均(MRR)を返す。
+
+    適合事例を含まないクエリのReciprocal Rankは0とする。
+
+    Args:
+        label_true (array-like): 正解ラベル(関連度)の系列
+        score (array-like): ランカーが出力したスコアの系列
+        qid (array-like): 各事例のqidの系列
+
+    Returns:
+        float: MRR
+    """
+
+    grouped = _group_by_qid(label_true, score, qid)
+
+    return float(np.mean(_reciprocal_rank(*grouped))) \
+        if len(grouped[2]) else 0.0
+
+
+def calc_ranking_metrics(label_true, score, qid, k=10):
+    """ NDCG@k, MAP, MRRをまとめて計算して返す。
+
+    extractor.sparse_data_format_to_index_list(..., is_get_qid=True)が返す
+    ラベル・qidの配列と、ランカーのスコアの配列をそのまま渡せる。
+    クエリごとのPythonループは行わず、全クエリを一度のソートと集約で計算する。
+
+    Args:
+        label_true (array-like): 正解ラベル(関連度)の系列
+        score (array-like): ランカーが出力したスコアの系列
+        qid (array-like): 各事例のqidの系列
+        k (int): NDCGの計算に用いる上位の件数
+
+    Returns:
+        ranking_metrics: (ndcg, map, mrr)のnamedtuple
+    """
+
+    grouped = _group_by_qid(label_true, score, qid)
+    if len(grouped[2]) == 0:
+        return ranking_metrics(0.0, 0.0, 0.0)
+
+    return ranking_metrics(
+            float(np.mean(_ndcg(*grouped, k=k))),
+            float(np.mean(_average_precision(*grouped))),
+            float(np.mean(_reciprocal_rank(*grouped)))
+    )
@@ -1,7 +1,11 @@
 # coding=utf-8
 
-from joblib import Parallel, delayed
 from collections import Counter, defaultdict
+from itertools import chain
+from .lazy import LazyModule
+from .profiler import timed, count
+
+joblib = LazyModule("joblib")
 
 class Ngrams():
     """ The class to create vocabulary of ngrams.
@@ -17,41 +21,49 @@ class Ngrams():
         self.trivocab = self.make_ngrams(3)
 
     @staticmethod
-    def ngramalize(self, tokens, N=1):
+    def ngramalize(tokens, N=1):
         """ generate ngram from tokens parameterized by N.
         Params:
-            tokens(list): the list of str to generate Ngrams
+            tokens(list): the list of str (or bytes) to generate Ngrams
             N(int): context size of Ngrams (e.g., N=1 -> unigram, N=2 -> bigram, N=3 -> trigram, ...)
         Returns:
-            list: the list of ngrams. Ngrams are represented by str. Tokens are concated by '_'.
+            list: the list of ngrams. Ngrams are represented by the same type as tokens. Tokens are concated by '_'.
         """
-        ngrams = []
-        for i in xrange(len(tokens)+(-N+1)):
-            ngrams.append(u"_".join(tokens[i:i+N]))
-        return ngrams
+        sep = b"_" if tokens and isinstance(tokens[0], bytes) else u"_"
+        return [sep.join(tokens[i:i+N]) for i in range(len(tokens)+(-N+1))]
     
-    def __sub_make_ngrams(self, p, N):
-        N = len(self.text_paths)
-        ini = N * (p) / self.process_num
-        fin = N * (p + 1) / self.process_num
+    def _sub_make_ngrams(self, p, N):
+        """ count ngrams in the p-th split of self.text_paths.
+        Files are read and split as bytes; ngrams are decoded only when they are kept as vocabs (see make_ngrams).
+        Params:
+            p(int): index of the split
+            N(int): context size of Ngrams
+        Returns:
+            Counter: the counts of ngrams represented by bytes.
+        """
+        path_num = len(self.text_paths)
+        ini = path_num * p // self.process_num
+        fin = path_num * (p + 1) // self.process_num
    
-        ngram_list = []
-        for i in xrange(ini, fin):
-            path = self.text_paths[i]
-            sents = open(path).read().decode("utf-8", "ignore").split(u"\n")
-            sents_tokens = [s.split(u"\t") for s in sents]
-           
-            # flatten
-            ngram_list += [token for tokens in sents_tokens for token in Ngrams.ngramalize(tokens, N=N)]
+        cnt = Counter()
+        for i in range(ini, fin):
+            with open(self.text_paths[i], "rb") as f:
+                sents = f.read().split(b"\n")
+            cnt.update(chain.from_iterable(
+                Ngrams.ngramalize(s.split(b"\t"), N=N) for s in sents
+            ))
     
-        return Counter(ngram_list)
+        return cnt
    
+    @timed("ngrams.make_ngrams")
     def make_ngrams(self, N):
                 
-        callback = Parallel(n_jobs=self.process_num)(delayed(self.__sub_make_ngrams)(i, N) for i in range(self.process_num))
-        cnt = Counter()
-        for _cnt in callback:
-            cnt += _cnt
+        callback = joblib.Parallel(n_jobs=self.process_num)(joblib.delayed(self._sub_make_ngrams)(i, N) for i in range(self.process_num))
+        # merge the counts into the first one to avoid copying it
+        cnt = callback[0]
+        for _cnt in callback[1:]:
+            cnt.update(_cnt)
+        count("ngrams.make_ngrams", "docs", len(self.text_paths))
 
         # use ngrams that appeared more than self.THR times as vocabs.
         # ngrams = filter(lambda x: x[1]>=self.THR, cnt.most_common())
@@ -59,8 +71,8 @@ class Ngrams():
         # use ngrams that most common top_N(self.THR) as vocabs.
         ngrams = cnt.most_common()[:self.THR]
     
-        # generate vocab from ngrams
+        # generate vocab from ngrams (decode only the ngrams kept as vocabs)
         vocab = defaultdict(lambda: len(vocab))
-        [vocab[tok[0]] for tok in ngrams]
+        [vocab[tok[0].decode("utf-8", "ignore")] for tok in ngrams]
 
         return vocab   
@@ -0,0 +1,504 @@
+# coding=utf-8
+
+"""
+生テキストから学習用の疎行列までを、ストリーミングで処理するパイプラインを提供するモジュール
+
+各ステージは1件の入力を1件の出力に変換する関数で、ジェネレータとして連結される。
+process_numを2以上にしたステージは、上限付きのキューを介してワーカープロセスで並列に処理される。
+出力の順序は入力の順序と一致する。
+
+Example:
+    ngrams = Ngrams(token_paths, process_num=4)
+    pipe = corpus_pipeline(
+            VocabFeaturizer.from_ngrams(ngrams),
+            tagger_factory=MeCab.Tagger,
+            process_nums=(1, 4, 2)
+    )
+    x = pipe.to_csr(iter_documents(blog_paths))
+"""
+
+import io
+import array
+import queue
+import threading
+import traceback
+from collections import Counter
+
+from .lazy import LazyModule
+from .ngrams import Ngrams
+from . import profiler
+from .profiler import stage
+from .text_processor import extract_words, sentenize
+
+multiprocessing = LazyModule("multiprocessing")
+np = LazyModule("numpy")
+sp = LazyModule("scipy.sparse")
+
+# 並列ステージの出力キューで、入力の終端(または入力側の例外)を通知するための番号
+_END_OF_INPUT = -1
+# ワーカーが終了の指示を受けて終了したこと(と、そのプロセスの計測結果)を通知するための番号
+_WORKER_DONE = -2
+# キューの読み書きを待つ間隔[秒]。この間隔でワーカーの異常終了や停止の指示を確認する
+_POLL_INTERVAL = 0.1
+# int32で表せるindexの最大値
+_INT32_MAX = 2 ** 31 - 1
+
+
+def iter_documents(paths, encoding="utf-8"):
+    """ テキストファイルを1件ずつ読み込み、段落のリストとして返すジェネレータ
+
+    ファイル内の空でない各行を1つの段落とみなす。
+
+    Args:
+        paths (list): テキストファイルのパスのリスト
+        encoding (str): テキストファイルの文字コード
+
+    Yields:
+        list: 1文書分の段落を要素として持つリスト
+    """
+
+    for path in paths:
+        with io.open(path, encoding=encoding, errors="ignore") as f:
+            yield [line.strip() for line in f if line.strip()]
+
+
+class SentenizeStage(object):
+    """ 段落のリストを文のリストに変換するステージ関数
+    """
+
+    def __call__(self, paragraphs):
+        return sentenize(paragraphs)
+
+
+class TokenizeStage(object):
+    """ 文のリストを、文ごとの単語列のリストに変換するステージ関数
+
+    Taggerはpickleできないため、各プロセスで初めて呼ばれた時点でtagger_factoryから生成する。
+
+    Attributes:
+        tagger_factory (function): Taggerを生成する関数。Noneの場合はMeCab.Taggerを用いる。
+        content_filter (bool): Trueの場合は内容語のみを残す。
+        attr (str): 単語列に用いるWordDataの属性名('surface'または'baseform')
+    """
+
+    def __init__(self, tagger_factory=None, content_filter=True, attr="baseform"):
+        self.tagger_factory = tagger_factory
+        self.content_filter = content_filter
+        self.attr = attr
+        self._tagger = None
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state["_tagger"] = None
+
+        return state
+
+    def __call__(self, sents):
+        if self._tagger is None:
+            if self.tagger_factory is None:
+                import MeCab
+                self.tagger_factory = MeCab.Tagger
+            self._tagger = self.tagger_factory()
+        sents_words = extract_words(
+                sents,
+                self._tagger,
+                content_filter=self.content_filter
+        )
+
+        return [[getattr(w, self.attr) for w in words] for words in sents_words]
+
+
+class VocabFeaturizer(object):
+    """ 文ごとの単語列を、Ngramsの語彙に基づく素性(index, 値)に変換するステージ関数
+
+    N-gramは文をまたがずに生成する。語彙に含まれないN-gramは無視する。
+    vocabs[n-1]をn-gramの語彙とし、n-gramのindexにはそれより小さいnの語彙数の合計を加算する。
+
+    Attributes:
+        vocabs (list): N-gramの表層をキー、indexを値とするdictのリスト
+        binary (bool): Trueの場合は出現回数ではなく1を値とする。
+        n_features (int): 素性の次元数
+    """
+
+    def __init__(self, vocabs, binary=False):
+        # Ngramsの語彙はdefaultdictなので、参照で語彙が増えないようdictに変換する
+        self.vocabs = [dict(vocab) for vocab in vocabs]
+        self.binary = binary
+        self.offsets = []
+        offset = 0
+        for vocab in self.vocabs:
+            self.offsets.append(offset)
+            offset += len(vocab)
+        self.n_features = offset
+
+    @classmethod
+    def from_ngrams(cls, ngrams, binary=False):
+        """ Ngramsのuni-, bi-, tri-gramの語彙からVocabFeaturizerを生成する。
+
+        Args:
+            ngrams (Ngrams): 語彙を生成済みのNgrams
+            binary (bool): Trueの場合は出現回数ではなく1を値とする。
+
+        Returns:
+            VocabFeaturizer: 生成したVocabFeaturizer
+        """
+
+        return cls(
+                [ngrams.univocab, ngrams.bivocab, ngrams.trivocab],
+                binary=binary
+        )
+
+    def __call__(self, sents_tokens):
+        cnt = Counter()
+        for tokens in sents_tokens:
+            for n, (vocab, offset) in enumerate(zip(self.vocabs, self.offsets), 1):
+                for ngram in Ngrams.ngramalize(tokens, N=n):
+                    idx = vocab.get(ngram)
+                    if idx is not None:
+                        cnt[offset + idx] += 1
+
+        return _to_feature(cnt, self.binary)
+
+
+def _to_feature(cnt, binary):
+    """ 素性のindexをキー、出現回数を値とするCounterを、indexの昇順の(index, 値)に変換する。
+
+    Args:
+        cnt (collections.Counter): 素性の出現回数
+        binary (bool): Trueの場合は出現回数ではなく1を値とする。
+
+    Returns:
+        list: 素性のindexのリスト
+        list: 素性の値のリスト
+    """
+
+    indices = sorted(cnt)
+    values = [1.0] * len(indices) if binary else [float(cnt[i]) for i in indices]
+
+    return indices, values
+
+
+class CSRBuilder(object):
+    """ 行ごとの素性を、CSR形式のバッファに直接追記して疎行列を組み立てる。
+
+    indicesとindptrは、scipy.sparseが優先するint32で保持する。
+    非ゼロ要素数がint32の範囲を超えた時点で、いずれもint64に切り替える。
+
+    Attributes:
+        n_features (int): 素性の次元数
+    """
+
+    def __init__(self, n_features):
+        self.n_features = n_features
+        self._indptr = array.array("i", [0])
+        self._indices = array.array("i")
+        self._data = array.array("d")
+
+    def __len__(self):
+        return len(self._indptr) - 1
+
+    def append(self, indices, values):
+        """ 1行分の素性を追記する。
+
+        Args:
+            indices (list): 素性のindexのリスト(昇順)
+            values (list): 素性の値のリスト
+        """
+
+        if self._indices.typecode == "i" and \
+                len(self._indices) + len(indices) > _INT32_MAX:
+            self._indptr = array.array("q", self._indptr)
+            self._indices = array.array("q", self._indices)
+        self._indices.extend(indices)
+        self._data.extend(values)
+        self._indptr.append(len(self._indices))
+
+    def to_csr(self):
+        """ 追記した行からscipy.sparse.csr_matrixを生成する。
+
+        indicesとindptrのdtypeが揃っているため、バッファをコピーせずに疎行列のデータとして用いる。
+        そのため、呼び出し後は行を追記できない。
+
+        Returns:
+            scipy.sparse.csr_matrix: (行数, n_features)の疎行列
+        """
+
+        index_dtype = np.int32 if self._indices.typecode == "i" else np.int64
+
+        return sp.csr_matrix(
+                (
+                    np.frombuffer(self._data, dtype=np.float64),
+                    np.frombuffer(self._indices, dtype=index_dtype),
+                    np.frombuffer(self._indptr, dtype=index_dtype)
+                ),
+                shape=(len(self), self.n_features)
+        )
+
+
+class Stage(object):
+    """ パイプラインの1ステージ
+
+    Attributes:
+        func (function): 1件の入力を1件の出力に変換する関数。
+                         process_numが2以上の場合はpickleできる必要がある。
+        process_num (int): ワーカープロセス数。1以下の場合は呼び出し元のプロセスで処理する。
+        chunksize (int): ワーカープロセスにまとめて渡す入力の件数
+    """
+
+    def __init__(self, func, process_num=1, chunksize=16):
+        self.func = func
+        self.process_num = process_num
+        self.chunksize = chunksize
+
+
+def _chunked(iterable, chunksize):
+    """ iterableをchunksize件ずつのリストに区切って返すジェネレータ
+    """
+
+    chunk = []
+    for item in iterable:
+        chunk.append(item)
+        if len(chunk) >= chunksize:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def _worker(func, in_queue, out_queue, profile):
+    """ in_queueから(番号, 入力のリスト)を受け取り、(番号, 出力のリスト, エラー)をout_queueに送る。
+
+    Noneを受け取ると、終了したことをout_queueに通知して終了する。
+    profileがTrueの場合は、このプロセスでの計測結果(profiler.summary())も合わせて送る。
+    """
+
+    # fork時に親プロセスから引き継いだ計測結果を、親プロセスで二重に集計しないよう破棄する
+    profiler.reset()
+    if profile:
+        profiler.enable()
+    while True:
+        task = in_queue.get()
+        if task is None:
+            break
+        seq, items = task
+        try:
+            out_queue.put((seq, [func(item) for item in items], None))
+        except Exception:
+            out_queue.put((seq, None, traceback.format_exc()))
+    out_queue.put((
+        _WORKER_DONE,
+        profiler.summary() if profile else None,
+        None
+    ))
+
+
+def _put(q, item, stop):
+    """ stopがセットされるまで、qに空きができるのを待ってitemを積む。
+
+    Returns:
+        bool: 積めた場合はTrue, 積む前にstopがセットされた場合はFalse
+    """
+
+    while not stop.is_set():
+        try:
+            q.put(item, timeout=_POLL_INTERVAL)
+            return True
+        except queue.Full:
+            continue
+
+    return False
+
+
+def _feed(iterable, chunksize, process_num, in_queue, out_queue, stop):
+    """ iterableをchunksize件ずつin_queueに送り、最後に総チャンク数をout_queueに通知する。
+
+    stopがセットされた場合は送るのをやめ、iterableがジェネレータなら閉じて上流のステージも終了させる。
+    """
+
+    try:
+        seq = 0
+        for chunk in _chunked(iterable, chunksize):
+            if not _put(in_queue, (seq, chunk), stop):
+                return
+            seq += 1
+        _put(out_queue, (_END_OF_INPUT, seq, None), stop)
+    except Exception:
+        _put(out_queue, (_END_OF_INPUT, None, traceback.format_exc()), stop)
+    finally:
+        if stop.is_set():
+            close = getattr(iterable, "close", None)
+            if close is not None:
+                close()
+        else:
+            for _ in range(process_num):
+                _put(in_queue, None, stop)
+
+
+def _parallel_map(stage_, iterable, queue_size):
+    """ stage_.funcをワーカープロセスで並列に適用し、入力の順に結果を返すジェネレータ
+
+    入力・出力のキューはいずれもqueue_sizeチャンクを上限とするため、
+    下流の処理が遅い場合は上流の読み込みも止まり、メモリ使用量が抑えられる。
+    各ワーカーでの計測結果は、ワーカーの終了時にこのプロセスの計測結果に加える。
+    ワーカーが異常終了した場合はRuntimeErrorを送出する。途中でジェネレータを閉じた場合は
+    ワーカーを終了し、入力を送るスレッドと上流のステージも停止する。
+
+    Args:
+        stage_ (Stage): 適用するステージ
+        iterable (iterable): 入力
+        queue_size (int): キューに積めるチャンク数の上限
+
+    Yields:
+        object: stage_.funcの出力
+    """
+
+    in_queue = multiprocessing.Queue(queue_size)
+    out_queue = multiprocessing.Queue(queue_size)
+    workers = [
+        multiprocessing.Process(
+            target=_worker,
+            args=(stage_.func, in_queue, out_queue, profiler.is_enabled())
+        )
+        for _ in range(stage_.process_num)
+    ]
+    for w in workers:
+        w.daemon = True
+        w.start()
+    stop = threading.Event()
+    feeder = threading.Thread(
+            target=_feed,
+            args=(iterable, stage_.chunksize, stage_.process_num,
+                  in_queue, out_queue, stop)
+    )
+    feeder.daemon = True
+    feeder.start()
+
+    try:
+        pending, next_seq, total, finished = {}, 0, None, 0
+        while total is None or next_seq < total or finished < len(workers):
+            # 終了したワーカーの出力はすべてキューに書き出されているため、
+            # 待つ前に終了していたワーカーの終了通知が届かなければ、異常終了したとみなす
+            dead = [w for w in workers if not w.is_alive()]
+            try:
+                seq, results, error = out_queue.get(timeout=_POLL_INTERVAL)
+            except queue.Empty:
+                if len(dead) > finished:
+                    raise RuntimeError(
+                            "pipeline worker died unexpectedly "
+                            "(exitcodes: {})".format([w.exitcode for w in dead])
+                    )
+                continue
+            if error is not None:
+                raise RuntimeError(
+                        "pipeline stage failed:\n{}".format(error)
+                )
+            if seq == _END_OF_INPUT:
+                total = results
+                continue
+            if seq == _WORKER_DONE:
+                finished += 1
+                if results is not None:
+                    profiler.merge(results)
+                continue
+            # 出力の順序を入力の順序に揃える
+            pending[seq] = results
+            while next_seq in pending:
+                for result in pending.pop(next_seq):
+                    yield result
+                next_seq += 1
+    finally:
+        stop.set()
+        for w in workers:
+            if w.is_alive():
+                w.terminate()
+            w.join()
+        # 読み手のいなくなったキューのデータを書き出すのを待って、プロセスの終了が止まらないようにする
+        in_queue.cancel_join_thread()
+        out_queue.cancel_join_thread()
+        feeder.join()
+
+
+class Pipeline(object):
+    """ Stageを連結したストリーミング処理のパイプライン
+
+    Attributes:
+        stages (list): Stageのリスト。先頭から順に適用する。
+        queue_size (int): 並列ステージのキューに積めるチャンク数の上限
+    """
+
+    def __init__(self, stages, queue_size=64):
+        self.stages = stages
+        self.queue_size = queue_size
+
+    def stream(self, items):
+        """ itemsに各ステージを順に適用した結果を返すジェネレータ
+
+        Args:
+            items (iterable): 先頭のステージへの入力
+
+        Returns:
+            iterator: 最後のステージの出力
+        """
+
+        stream = iter(items)
+        for stage_ in self.stages:
+            if stage_.process_num > 1:
+                stream = _parallel_map(stage_, stream, self.queue_size)
+            else:
+                stream = map(stage_.func, stream)
+
+        return stream
+
+    def to_csr(self, items, n_features=None):
+        """ 最後のステージが出力する(index, 値)を1行として、疎行列を組み立てる。
+
+        Args:
+            items (iterable): 先頭のステージへの入力
+            n_features (int): 素性の次元数。Noneの場合は最後のステージ関数のn_featuresを用いる。
+
+        Returns:
+            scipy.sparse.csr_matrix: (入力件数, n_features)の疎行列
+        """
+
+        if n_features is None:
+            n_features = self.stages[-1].func.n_features
+        builder = CSRBuilder(n_features)
+        with stage("pipeline.to_csr") as st:
+            for indices, values in self.stream(items):
+                builder.append(indices, values)
+            x = builder.to_csr()
+            st.add("rows", x.shape[0])
+            st.add("nonzeros", x.nnz)
+
+        return x
+
+
+def corpus_pipeline(featurizer, tagger_factory=None, process_nums=(1, 1, 1),
+                    content_filter=True, attr="baseform", queue_size=64,
+                    chunksize=16):
+    """ 段落のリスト → 文 → 単語列 → 素性 の順に処理するパイプラインを生成する。
+
+    Args:
+        featurizer (VocabFeaturizer or hashing.HashingVectorizer): 単語列を素性に変換するステージ関数
+        tagger_factory (function): Taggerを生成する関数。Noneの場合はMeCab.Taggerを用いる。
+        process_nums (tuple): 文分割、形態素解析、素性抽出それぞれのワーカープロセス数
+        content_filter (bool): Trueの場合は内容語のみを素性に用いる。
+        attr (str): 単語列に用いるWordDataの属性名('surface'または'baseform')
+        queue_size (int): 並列ステージのキューに積めるチャンク数の上限
+        chunksize (int): ワーカープロセスにまとめて渡す入力の件数
+
+    Returns:
+        Pipeline: 生成したパイプライン
+    """
+
+    funcs = [
+        SentenizeStage(),
+        TokenizeStage(tagger_factory, content_filter=content_filter, attr=attr),
+        featurizer
+    ]
+
+    return Pipeline(
+            [Stage(f, process_num=p, chunksize=chunksize)
+             for f, p in zip(funcs, process_nums)],
+            queue_size=queue_size
+    )
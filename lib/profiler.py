@@ -0,0 +1,316 @@
+# coding=utf-8
+
+"""
+パイプラインの各ステージの処理時間・スループットを計測する機能を提供するモジュール
+
+環境変数MYNLP_PROFILEに1を設定するか、enable()を呼ぶと計測が有効になる。
+無効時はstage()が共有のダミーオブジェクトを返すだけなので、ほぼコストはかからない。
+環境変数MYNLP_PROFILE_JSONにパスを設定すると、プロセス終了時に集計結果をJSONで書き出す。
+
+Example:
+    with stage("sentenize") as st:
+        sents = sentenize(text)
+        st.add("sents", len(sents))
+
+    @timed("load")
+    def load(path):
+        lines = open(path).readlines()
+        count("load", "lines", len(lines))
+        return lines
+"""
+
+import os
+import json
+import time
+import atexit
+import threading
+import functools
+from collections import defaultdict
+
+try:
+    import resource
+except ImportError:  # Windowsではピークメモリは計測しない
+    resource = None
+
+ENV_ENABLE = "MYNLP_PROFILE"
+ENV_JSON_PATH = "MYNLP_PROFILE_JSON"
+
+_enabled = os.environ.get(ENV_ENABLE, "0") not in ("", "0")
+_lock = threading.Lock()
+# ステージ名をキーとして、計測結果を集計する
+_stats = defaultdict(lambda: {
+    "calls": 0,
+    "seconds": 0.0,
+    "counters": defaultdict(int),
+    "rss_growth_kb": 0,
+    "process_peak_rss_kb": 0
+})
+
+
+def enable():
+    """ 計測を有効にする。
+    """
+
+    global _enabled
+    _enabled = True
+
+
+def disable():
+    """ 計測を無効にする。
+    """
+
+    global _enabled
+    _enabled = False
+
+
+def is_enabled():
+    """ 計測が有効か否かを返す。
+
+    Returns:
+        bool: 有効ならTrue, そうでないならFalse
+    """
+
+    return _enabled
+
+
+def reset():
+    """ これまでの計測結果を破棄する。
+    """
+
+    with _lock:
+        _stats.clear()
+
+
+def _peak_rss_kb():
+    """ プロセスのピークRSS(KB)を返す。取得できない環境では0を返す。
+
+    Returns:
+        int: ピークRSS(KB)
+    """
+
+    if resource is None:
+        return 0
+
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+class _NullStage(object):
+    """ 計測が無効な場合にstage()が返す、何もしないステージ
+    """
+
+    enabled = False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+    def add(self, key, n=1):
+        pass
+
+
+_NULL_STAGE = _NullStage()
+
+
+class _Stage(object):
+    """ 1回分のステージの処理時間とカウンタを計測し、終了時に集計結果へ加算する。
+
+    Attributes:
+        name (str): ステージ名
+        counters (dict): 処理件数のカウンタ。キーはカウンタ名(lines, tokens, ...)
+    """
+
+    enabled = True
+
+    def __init__(self, name):
+        self.name = name
+        self.counters = defaultdict(int)
+        self._begin = None
+        self._begin_peak_rss = 0
+
+    def __enter__(self):
+        self._begin_peak_rss = _peak_rss_kb()
+        self._begin = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        elapsed = time.perf_counter() - self._begin
+        peak_rss = _peak_rss_kb()
+        with _lock:
+            stat = _stats[self.name]
+            stat["calls"] += 1
+            stat["seconds"] += elapsed
+            for key, n in self.counters.items():
+                stat["counters"][key] += n
+            # ru_maxrssはプロセス開始からのピークなので、ステージ中の増分をステージのピークとみなす
+            stat["rss_growth_kb"] = max(
+                    stat["rss_growth_kb"],
+                    peak_rss - self._begin_peak_rss
+            )
+            stat["process_peak_rss_kb"] = max(
+                    stat["process_peak_rss_kb"],
+                    peak_rss
+            )
+        return False
+
+    def add(self, key, n=1):
+        """ カウンタにnを加算する。
+
+        Args:
+            key (str): カウンタ名
+            n (int): 加算する件数
+        """
+
+        self.counters[key] += n
+
+
+def stage(name):
+    """ nameのステージを計測するコンテキストマネージャを返す。
+
+    Args:
+        name (str): ステージ名
+
+    Returns:
+        _Stage or _NullStage: 計測が無効な場合は何もしないステージ
+    """
+
+    return _Stage(name) if _enabled else _NULL_STAGE
+
+
+def timed(name=None):
+    """ 関数の呼び出しをステージとして計測するデコレータ
+
+    Args:
+        name (str): ステージ名。省略した場合は関数の修飾名を用いる。
+
+    Returns:
+        function: デコレータ
+    """
+
+    def decorator(func):
+        stage_name = name or "{}.{}".format(func.__module__, func.__name__)
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return func(*args, **kwargs)
+            with _Stage(stage_name):
+                return func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def count(name, key, n=1):
+    """ nameのステージのカウンタにnを加算する。timedと組み合わせて用いる。
+
+    Args:
+        name (str): ステージ名
+        key (str): カウンタ名
+        n (int): 加算する件数
+    """
+
+    if not _enabled:
+        return
+    with _lock:
+        _stats[name]["counters"][key] += n
+
+
+def summary():
+    """ ステージごとの計測結果を返す。
+
+    各カウンタについて、1秒あたりの処理件数("<カウンタ名>/sec")も合わせて返す。
+
+    Returns:
+        dict: ステージ名をキーとし、calls, seconds, counters, rates, rss_growth_kb,
+              process_peak_rss_kbを持つdict。
+              rss_growth_kbはステージ実行中にプロセスのピークRSSが増えた量(1回あたりの最大値)、
+              process_peak_rss_kbはステージ終了時点でのプロセス全体のピークRSS
+    """
+
+    result = {}
+    with _lock:
+        for name, stat in _stats.items():
+            seconds = stat["seconds"]
+            result[name] = {
+                "calls": stat["calls"],
+                "seconds": seconds,
+                "counters": dict(stat["counters"]),
+                "rates": {
+                    "{}/sec".format(key): (n / seconds if seconds > 0 else 0.0)
+                    for key, n in stat["counters"].items()
+                },
+                "rss_growth_kb": stat["rss_growth_kb"],
+                "process_peak_rss_kb": stat["process_peak_rss_kb"]
+            }
+
+    return result
+
+
+def merge(stats):
+    """ 他のプロセスでsummary()が返した計測結果を、このプロセスの集計結果に加える。
+
+    calls, seconds, カウンタは加算し、rss_growth_kbとprocess_peak_rss_kbは最大値をとる。
+    そのため、複数プロセスで並列に処理したステージのsecondsは各プロセスの処理時間の合計になる。
+
+    Args:
+        stats (dict): summary()の返り値
+    """
+
+    with _lock:
+        for name, other in stats.items():
+            stat = _stats[name]
+            stat["calls"] += other["calls"]
+            stat["seconds"] += other["seconds"]
+            for key, n in other["counters"].items():
+                stat["counters"][key] += n
+            stat["rss_growth_kb"] = max(
+                    stat["rss_growth_kb"],
+                    other["rss_growth_kb"]
+            )
+            stat["process_peak_rss_kb"] = max(
+                    stat["process_peak_rss_kb"],
+                    other["process_peak_rss_kb"]
+            )
+
+
+def log_summary(logger):
+    """ ステージごとの計測結果をloggerに出力する。
+
+    Args:
+        logger (logging.Logger): 出力先のlogger。logger.get_loggerで取得したものを想定。
+    """
+
+    for name, stat in sorted(summary().items()):
+        rates = ", ".join(
+                "{}={:.1f}".format(key, rate)
+                for key, rate in sorted(stat["rates"].items())
+        )
+        logger.info(
+                "[profile] %s: calls=%d, seconds=%.3f, rss_growth_kb=%d, "
+                "process_peak_rss_kb=%d, %s",
+                name, stat["calls"], stat["seconds"], stat["rss_growth_kb"],
+                stat["process_peak_rss_kb"], rates
+        )
+
+
+def dump_json(path):
+    """ ステージごとの計測結果をJSONファイルに書き出す。
+
+    Args:
+        path (str): 書き出すファイルのパス
+    """
+
+    with open(path, "w") as f:
+        json.dump(summary(), f, indent=2, sort_keys=True)
+
+
+def _dump_at_exit():
+    path = os.environ.get(ENV_JSON_PATH)
+    if _enabled and path:
+        dump_json(path)
+
+
+atexit.register(_dump_at_exit)
@@ -1,11 +1,14 @@
 # coding=utf-8
 
 import re
-import zenhan
 from collections import namedtuple
 
 from .const import MeCabConst as mc
 from .const import SentenizerConst as sc
+from .lazy import LazyModule
+from .profiler import timed, count
+
+zenhan = LazyModule("zenhan")
 
 
 WordData = namedtuple(
@@ -25,6 +28,7 @@ class WordDataWithDocstring(WordData):
     """
 
 
+@timed("text_processor.extract_words")
 def extract_words(sents, tagger, content_filter=True):
     """ taggerを用いて形態素解析し、sentsに含まれる単語の情報を返す。
 
@@ -58,6 +62,7 @@ def extract_words(sents, tagger, content_filter=True):
             return False
 
     sents_words = []
+    n_tokens = 0
     for i, s in enumerate(sents):
         tagger.parse('')
         node = tagger.parseToNode(s)
@@ -65,6 +70,9 @@ def extract_words(sents, tagger, content_filter=True):
         while node:
             # 解析後の品詞、表層、細分類などは','区切りの文字列
             features = node.feature.split(',')
+            # 文頭・文末のノードは形態素として数えない
+            if features[mc.POS_IDX.value] != mc.POS_BOS_EOS.value:
+                n_tokens += 1
             surface = node.surface
             base_form = features[mc.BASEFORM_IDX.value] \
                 if features[mc.BASEFORM_IDX.value] != mc.EMPTY_STR.value \
@@ -81,9 +89,14 @@ def extract_words(sents, tagger, content_filter=True):
                 )
             node = node.next
         sents_words.append(words)
+
+    count("text_processor.extract_words", "sents", len(sents))
+    count("text_processor.extract_words", "tokens", n_tokens)
+
     return sents_words
 
 
+@timed("text_processor.sentenize")
 def sentenize(text):
     """ 日本語テキストを文分割する。
 
@@ -278,10 +291,12 @@ def sentenize(text):
 
         return p.match(replaced) is not None
 
+    count("text_processor.sentenize", "lines", len(text))
     text = __mask_url(text)
     text_masked, mask_info = __mask_delimiter(text)
     sents = __split_by_delimiter(text_masked)
     sents = sents if mask_info == [] else __demask_delimiter(sents, mask_info)
     sents = [s for s in sents if __is_alphabet_only(s) is False]
+    count("text_processor.sentenize", "sents", len(sents))
 
     return [sent.strip() for sent in sents]
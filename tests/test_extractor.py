@@ -0,0 +1,57 @@
+# coding=utf-8
+
+import os
+
+import numpy as np
+import pytest
+
+pytest.importorskip("scipy")
+cutils = pytest.importorskip("lib.cutils")
+
+from lib import extractor
+from lib.bench import generators, legacy
+
+
+def test_get_idx_matches_legacy():
+    lines = generators.letor_lines(20, feature_num=1000, nnz_per_doc=30)
+    lines += ["1 qid:1 1:1", "0 qid:2", "1 qid:3 5:1 7:0.5", "1 2:1 10:1"]
+    for line in lines:
+        assert cutils.get_idx(line.encode("utf-8")) == legacy.get_idx(line)
+
+
+@pytest.mark.parametrize("case", [
+    b"1 qid:1 0:1",
+    b"1 qid:1 2147483649:1",
+    b"1 qid:1 99999999999999999999999:1",
+    b"1 qid:1 a:1",
+    b"1 qid:1 :1"
+])
+def test_get_idx_rejects_invalid_index(case):
+    with pytest.raises(ValueError):
+        cutils.get_idx(case)
+
+
+def test_index_list_matches_legacy(tmp_path):
+    path = generators.write_letor_file(
+            os.path.join(str(tmp_path), "letor.txt"),
+            30,
+            feature_num=1000,
+            nnz_per_doc=30
+    )
+    x, y, qid = extractor.sparse_data_format_to_index_list(
+            path, 1000, is_get_qid=True)
+    x_legacy, y_legacy, qid_legacy = legacy.sparse_data_format_to_index_list(
+            path, 1000, is_get_qid=True)
+
+    assert (x != x_legacy).nnz == 0
+    np.testing.assert_array_equal(y, y_legacy)
+    np.testing.assert_array_equal(qid, qid_legacy)
+
+
+def test_index_list_rejects_index_beyond_feature_num(tmp_path):
+    path = os.path.join(str(tmp_path), "letor.txt")
+    with open(path, "w") as f:
+        f.write("1 qid:1 1:1 11:1\n")
+
+    with pytest.raises(ValueError):
+        extractor.sparse_data_format_to_index_list(path, 10)
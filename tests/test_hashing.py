@@ -0,0 +1,94 @@
+# coding=utf-8
+
+import os
+import zlib
+
+import numpy as np
+import pytest
+
+pytest.importorskip("scipy")
+
+from lib.hashing import HashingVectorizer
+from lib.ngrams import Ngrams
+from lib.bench import generators
+
+
+def _reference(sents_tokens, n_bits, max_n, signed):
+    """ Ngrams.ngramalizeで生成したN-gramの文字列をそのままハッシュした素性を返す。
+    """
+
+    mask = 2 ** n_bits - 1
+    values = {}
+    for tokens in sents_tokens:
+        for n in range(1, max_n + 1):
+            for ngram in Ngrams.ngramalize(tokens, N=n):
+                h = zlib.crc32(ngram.encode("utf-8"))
+                v = -1.0 if signed and h >> 31 else 1.0
+                values[h & mask] = values.get(h & mask, 0.0) + v
+    indices = sorted(i for i, v in values.items() if v != 0.0)
+
+    return indices, [values[i] for i in indices]
+
+
+def _docs(n_docs, seed=0):
+    lines = generators.tokenized_lines(
+            n_docs * 5, tokens_per_line=8, vocab_size=50, seed=seed)
+    sents = [line.split("\t") for line in lines]
+
+    return [sents[i:i + 5] for i in range(0, len(sents), 5)]
+
+
+# n_bits=6では衝突が起き、符号による打ち消し合いも含めて比較できる
+@pytest.mark.parametrize("n_bits, max_n, signed", [
+    (20, 3, True),
+    (6, 3, True),
+    (6, 2, False),
+    (31, 1, True)
+])
+def test_incremental_crc32_matches_explicit_ngrams(n_bits, max_n, signed):
+    vectorizer = HashingVectorizer(n_bits=n_bits, max_n=max_n, signed=signed)
+    docs = _docs(20) + [[["東京", "に", "行く"], [], ["猫"]]]
+    for doc in docs:
+        indices, values = vectorizer(doc)
+        expected_indices, expected_values = _reference(
+                doc, n_bits, max_n, signed)
+        assert indices == expected_indices
+        assert values == expected_values
+
+
+def test_binary_keeps_only_signs():
+    doc = _docs(1)[0]
+    indices, values = HashingVectorizer(n_bits=6, binary=True)(doc)
+    expected_indices, expected_values = _reference(doc, 6, 3, True)
+
+    assert indices == expected_indices
+    assert values == [1.0 if v > 0 else -1.0 for v in expected_values]
+
+
+@pytest.mark.parametrize("n_bits", [0, 32])
+def test_n_bits_out_of_range(n_bits):
+    with pytest.raises(ValueError):
+        HashingVectorizer(n_bits=n_bits)
+
+
+def test_transform_files_parallel_matches_serial(tmp_path):
+    paths = generators.write_tokenized_corpus(
+            os.path.join(str(tmp_path), "corpus"), 12, lines_per_doc=20)
+    vectorizer = HashingVectorizer(n_bits=16)
+
+    serial = vectorizer.transform_files(paths)
+    parallel = vectorizer.transform_files(paths, process_num=3, chunksize=2)
+
+    assert serial.shape == (12, 2 ** 16)
+    assert (serial != parallel).nnz == 0
+
+
+def test_transform_matches_call():
+    docs = _docs(10)
+    vectorizer = HashingVectorizer(n_bits=12)
+    x = vectorizer.transform(docs, process_num=2, chunksize=3)
+
+    for row, doc in enumerate(docs):
+        indices, values = vectorizer(doc)
+        np.testing.assert_array_equal(x[row].indices, indices)
+        np.testing.assert_array_equal(x[row].data, values)
@@ -0,0 +1,106 @@
+# coding=utf-8
+
+import io
+import os
+import sys
+import logging
+import logging.handlers
+
+import pytest
+
+from lib import logger as mylogger
+from lib.const import LOG_DIR
+
+
+@pytest.fixture(autouse=True)
+def log_dir(tmp_path, monkeypatch):
+    """ LOG_DIRが相対パスなので、一時ディレクトリに移動してログを書き出す。
+    """
+
+    monkeypatch.chdir(str(tmp_path))
+    yield os.path.join(str(tmp_path), LOG_DIR)
+    mylogger.stop_listeners()
+
+
+def _read(log_dir, file_name):
+    with io.open(os.path.join(log_dir, file_name + ".log"), encoding="utf-8") as f:
+        return f.read()
+
+
+def test_get_logger_does_not_duplicate_handlers(log_dir):
+    logger = mylogger.get_logger("dup", "test.dup")
+    assert mylogger.get_logger("dup", "test.dup") is logger
+    logger.info("once")
+    mylogger.stop_listeners()
+
+    assert _read(log_dir, "dup").count("once") == 1
+
+
+def test_get_logger_switches_to_requested_file(log_dir):
+    mylogger.get_logger("f1", "test.switch").info("to f1")
+    logger = mylogger.get_logger("f2", "test.switch")
+    logger.info("to f2")
+    mylogger.stop_listeners()
+
+    assert "to f2" not in _read(log_dir, "f1")
+    assert "to f2" in _read(log_dir, "f2")
+    assert sum(isinstance(h, logging.handlers.QueueHandler)
+               for h in logger.handlers) == 0
+
+
+def test_get_logger_updates_flush_interval(log_dir):
+    mylogger.get_logger("flush", "test.flush", flush_interval=100)
+    _, listener = mylogger._listeners[mylogger._get_log_path("flush")]
+    handler = listener.handlers[0]
+    assert handler.flush_interval == 100
+
+    mylogger.get_logger("flush", "test.flush")
+    assert handler.flush_interval == 100
+    mylogger.get_logger("flush", "test.flush", flush_interval=10)
+    assert handler.flush_interval == 10
+
+
+def test_args_are_formatted_at_enqueue(log_dir):
+    logger = mylogger.get_logger("args", "test.args")
+    items = [1]
+    logger.info("items=%s", items)
+    items.append(2)
+    mylogger.stop_listeners()
+
+    content = _read(log_dir, "args")
+    assert "items=[1]" in content
+    assert "items=[1, 2]" not in content
+
+
+def test_prepare_snapshots_message_and_exception():
+    handler = mylogger._DeferredFormatQueueHandler(None)
+    try:
+        raise KeyError("boom")
+    except KeyError:
+        record = logging.LogRecord(
+                "test", logging.ERROR, __file__, 0, "value=%s", ({"a": 1},),
+                sys.exc_info()
+        )
+    record = handler.prepare(record)
+
+    assert record.msg == "value={'a': 1}"
+    assert record.args is None
+    assert record.exc_info is None
+    assert "KeyError: 'boom'" in record.exc_text
+
+
+def test_stop_listeners_then_get_logger_restarts(log_dir):
+    logger = mylogger.get_logger("restart", "test.restart")
+    logger.info("before stop")
+    mylogger.stop_listeners()
+    assert not any(isinstance(h, logging.handlers.QueueHandler)
+                   for h in logger.handlers)
+
+    logger = mylogger.get_logger("restart", "test.restart")
+    assert len(mylogger._listeners) == 1
+    logger.info("after restart")
+    mylogger.stop_listeners()
+
+    content = _read(log_dir, "restart")
+    assert "before stop" in content
+    assert "after restart" in content
@@ -0,0 +1,83 @@
+# coding=utf-8
+
+import math
+import random
+from collections import OrderedDict
+
+import numpy as np
+import pytest
+
+from lib.metrics import (
+    calc_ranking_metrics,
+    mean_average_precision,
+    mean_reciprocal_rank,
+    ndcg_at_k
+)
+
+
+def _brute_force(label_true, score, qid, k):
+    """ クエリごとにPythonのループで計算したNDCG@k, MAP, MRRを返す。
+    """
+
+    groups = OrderedDict()
+    for label, s, q in zip(label_true, score, qid):
+        groups.setdefault(q, []).append((label, s))
+
+    ndcgs, aps, rrs = [], [], []
+    for q in sorted(groups):
+        # 同一スコアは入力順を保つ(sortedは安定ソート)
+        ranked = [max(l, 0) for l, _ in sorted(groups[q], key=lambda x: -x[1])]
+        dcg = sum((2.0 ** r - 1.0) / math.log2(i + 2.0)
+                  for i, r in enumerate(ranked[:k]))
+        ideal = sorted(ranked, reverse=True)
+        idcg = sum((2.0 ** r - 1.0) / math.log2(i + 2.0)
+                   for i, r in enumerate(ideal[:k]))
+        ndcgs.append(dcg / idcg if idcg > 0 else 0.0)
+
+        hits, prec_sum, rr = 0, 0.0, 0.0
+        for i, r in enumerate(ranked, 1):
+            if r > 0:
+                hits += 1
+                prec_sum += hits / float(i)
+                if rr == 0.0:
+                    rr = 1.0 / i
+        aps.append(prec_sum / hits if hits else 0.0)
+        rrs.append(rr)
+
+    return np.mean(ndcgs), np.mean(aps), np.mean(rrs)
+
+
+@pytest.mark.parametrize("seed", range(50))
+def test_ranking_metrics_match_brute_force(seed):
+    rng = random.Random(seed)
+    n = rng.randint(1, 200)
+    n_queries = rng.randint(1, 20)
+    # スコアの重複、-1のラベル、適合事例のないクエリ、kより小さいクエリを含める
+    label_true = [rng.choice([-1, 0, 0, 1, 2, 3]) for _ in range(n)]
+    score = [rng.randint(0, 5) / 5.0 for _ in range(n)]
+    qid = [rng.randint(1, n_queries) for _ in range(n)]
+    k = rng.randint(1, 10)
+
+    expected = _brute_force(label_true, score, qid, k)
+    result = calc_ranking_metrics(label_true, score, qid, k=k)
+
+    np.testing.assert_allclose(result, expected)
+    assert ndcg_at_k(label_true, score, qid, k=k) == pytest.approx(expected[0])
+    assert mean_average_precision(label_true, score, qid) == \
+        pytest.approx(expected[1])
+    assert mean_reciprocal_rank(label_true, score, qid) == \
+        pytest.approx(expected[2])
+
+
+def test_ranking_metrics_empty_input():
+    assert calc_ranking_metrics([], [], []) == (0.0, 0.0, 0.0)
+    assert ndcg_at_k([], [], []) == 0.0
+    assert mean_average_precision([], [], []) == 0.0
+    assert mean_reciprocal_rank([], [], []) == 0.0
+
+
+def test_ranking_metrics_length_mismatch():
+    with pytest.raises(ValueError):
+        calc_ranking_metrics([1, 0], [0.5], [1, 1])
+    with pytest.raises(ValueError):
+        ndcg_at_k([1, 0], [0.5, 0.1], [1])
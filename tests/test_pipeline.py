@@ -0,0 +1,165 @@
+# coding=utf-8
+
+import os
+import time
+import threading
+import multiprocessing
+
+import numpy as np
+import pytest
+
+pytest.importorskip("scipy")
+
+from lib import pipeline, profiler
+from lib.pipeline import CSRBuilder, Pipeline, Stage
+
+
+class Square(object):
+    """ 入力によって処理時間を変え、ワーカー間で出力の順序が入れ替わるようにする。
+    """
+
+    def __call__(self, x):
+        time.sleep((x % 3) * 0.001)
+        return x * x
+
+
+class FailAt(object):
+
+    def __init__(self, value):
+        self.value = value
+
+    def __call__(self, x):
+        if x == self.value:
+            raise ValueError("bad input: {}".format(x))
+        return x
+
+
+class ExitAt(object):
+
+    def __init__(self, value):
+        self.value = value
+
+    def __call__(self, x):
+        if x == self.value:
+            os._exit(1)
+        return x
+
+
+class CountItems(object):
+
+    def __call__(self, x):
+        profiler.count("test.count_items", "items")
+        return x
+
+
+def _failing_input(n):
+    for i in range(n):
+        yield i
+    raise IOError("broken input")
+
+
+@pytest.mark.parametrize("process_num, chunksize", [(2, 1), (3, 4), (4, 16)])
+def test_parallel_stage_keeps_input_order(process_num, chunksize):
+    pipe = Pipeline(
+            [Stage(Square(), process_num=process_num, chunksize=chunksize)],
+            queue_size=4
+    )
+
+    assert list(pipe.stream(range(200))) == [x * x for x in range(200)]
+
+
+def test_chained_parallel_stages():
+    pipe = Pipeline([
+        Stage(Square(), process_num=2, chunksize=3),
+        Stage(Square(), process_num=2, chunksize=5)
+    ])
+
+    assert list(pipe.stream(range(100))) == [x ** 4 for x in range(100)]
+
+
+def test_worker_error_is_raised():
+    pipe = Pipeline([Stage(FailAt(7), process_num=2, chunksize=2)])
+
+    with pytest.raises(RuntimeError, match="ValueError: bad input: 7"):
+        list(pipe.stream(range(20)))
+
+
+def test_input_error_is_raised():
+    pipe = Pipeline([Stage(Square(), process_num=2, chunksize=2)])
+
+    with pytest.raises(RuntimeError, match="broken input"):
+        list(pipe.stream(_failing_input(10)))
+
+
+def test_dead_worker_is_raised():
+    pipe = Pipeline([Stage(ExitAt(5), process_num=2, chunksize=1)])
+
+    with pytest.raises(RuntimeError, match="died unexpectedly"):
+        list(pipe.stream(range(1000)))
+    assert multiprocessing.active_children() == []
+
+
+def test_closing_stream_stops_workers_and_feeders():
+    n_threads = threading.active_count()
+    pipe = Pipeline([
+        Stage(Square(), process_num=2, chunksize=1),
+        Stage(Square(), process_num=2, chunksize=1)
+    ], queue_size=2)
+    stream = pipe.stream(iter(range(100000)))
+
+    assert [next(stream), next(stream)] == [0, 1]
+    stream.close()
+
+    assert multiprocessing.active_children() == []
+    deadline = time.time() + 5
+    while threading.active_count() > n_threads and time.time() < deadline:
+        time.sleep(0.05)
+    assert threading.active_count() == n_threads
+
+
+def test_worker_profiles_are_merged():
+    profiler.reset()
+    profiler.enable()
+    try:
+        pipe = Pipeline([Stage(CountItems(), process_num=3, chunksize=4)])
+        list(pipe.stream(range(50)))
+        counters = profiler.summary()["test.count_items"]["counters"]
+    finally:
+        profiler.disable()
+        profiler.reset()
+
+    assert counters["items"] == 50
+
+
+def test_csr_builder_to_csr_does_not_copy():
+    builder = CSRBuilder(5)
+    builder.append([0, 3], [1.0, 2.0])
+    builder.append([], [])
+    builder.append([4], [3.0])
+    x = builder.to_csr()
+
+    np.testing.assert_array_equal(
+            x.toarray(),
+            [[1, 0, 0, 2, 0], [0, 0, 0, 0, 0], [0, 0, 0, 0, 3]]
+    )
+    assert x.indices.dtype == np.int32
+    assert x.indptr.dtype == np.int32
+    assert np.shares_memory(x.indices, np.frombuffer(builder._indices, np.int32))
+    assert np.shares_memory(x.indptr, np.frombuffer(builder._indptr, np.int32))
+    assert np.shares_memory(x.data, np.frombuffer(builder._data, np.float64))
+
+
+def test_csr_builder_switches_to_int64(monkeypatch):
+    monkeypatch.setattr(pipeline, "_INT32_MAX", 3)
+    builder = CSRBuilder(5)
+    builder.append([0, 3], [1.0, 2.0])
+    assert builder._indices.typecode == "i"
+    builder.append([1, 4], [3.0, 4.0])
+    assert builder._indices.typecode == "q"
+    assert builder._indptr.typecode == "q"
+
+    x = builder.to_csr()
+    np.testing.assert_array_equal(
+            x.toarray(),
+            [[1, 0, 0, 2, 0], [0, 3, 0, 0, 4]]
+    )
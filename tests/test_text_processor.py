@@ -0,0 +1,26 @@
+# coding=utf-8
+
+import pytest
+
+from lib import profiler
+from lib.text_processor import extract_words
+from lib.bench.fake_mecab import FakeTagger
+
+
+@pytest.fixture
+def profiling():
+    profiler.reset()
+    profiler.enable()
+    yield
+    profiler.disable()
+    profiler.reset()
+
+
+def test_extract_words_counts_morphemes_without_bos_eos(profiling):
+    tagger = FakeTagger()
+    sents = ["私は東京に行きました", "猫が好きです"]
+    extract_words(sents, tagger, content_filter=False)
+
+    counters = profiler.summary()["text_processor.extract_words"]["counters"]
+    assert counters["sents"] == 2
+    assert counters["tokens"] == sum(len(tagger._tokenize(s)) for s in sents)